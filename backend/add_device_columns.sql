@@ -7,8 +7,8 @@ ALTER TABLE devices ADD COLUMN IF NOT EXISTS username VARCHAR(100);
 ALTER TABLE devices ADD COLUMN IF NOT EXISTS password TEXT;
 ALTER TABLE devices ADD COLUMN IF NOT EXISTS location VARCHAR(255);
 ALTER TABLE devices ADD COLUMN IF NOT EXISTS description TEXT;
-ALTER TABLE devices ADD COLUMN IF NOT EXISTS tags TEXT;
-ALTER TABLE devices ADD COLUMN IF NOT EXISTS device_metadata TEXT;
+ALTER TABLE devices ADD COLUMN IF NOT EXISTS tags JSONB;
+ALTER TABLE devices ADD COLUMN IF NOT EXISTS device_metadata JSONB;
 
 -- Update existing records with default values
 UPDATE devices SET name = 'Unknown Device' WHERE name IS NULL;
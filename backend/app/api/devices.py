@@ -68,7 +68,10 @@ async def create_device(
         )
     
     # Create new device
-    import json
+    encrypted_password = (
+        await encryption_service.encrypt_text_async(device_create.password)
+        if device_create.password else None
+    )
     new_device = Device(
         name=device_create.name,
         device_type=device_create.device_type,
@@ -78,11 +81,11 @@ async def create_device(
         port=device_create.port,
         rtsp_url=device_create.rtsp_url,
         username=device_create.username,
-        password=encryption_service.encrypt_text(device_create.password) if device_create.password else None,
+        password=encrypted_password,
         location=device_create.location,
         description=device_create.description,
-        tags=json.dumps(device_create.tags) if device_create.tags else None,
-        device_metadata=json.dumps(device_create.metadata) if device_create.metadata else None,
+        tags=device_create.tags or None,
+        device_metadata=device_create.metadata or None,
         status=DeviceStatus.ONLINE
     )
     
@@ -202,6 +205,7 @@ async def get_device_status(
     # Perform health check
     device_info = {
         "ip_address": device.ip_address,
+        "port": device.port,
         "rtsp_url": device.rtsp_url
     }
     
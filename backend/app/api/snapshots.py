@@ -97,13 +97,13 @@ async def get_snapshot(
         )
 
 
-@router.get("/{snapshot_id}/image", response_model=SnapshotImageResponse)
+@router.get("/{snapshot_id}/image", response_model=SnapshotImageResponse, deprecated=True)
 async def get_snapshot_image(
     snapshot_id: str,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    """Get snapshot image data by ID"""
+    """Get snapshot image data by ID as base64 JSON (use /{snapshot_id}/binary instead)"""
     try:
         snapshot = db.query(Snapshot).filter(Snapshot.id == snapshot_id).first()
         if not snapshot:
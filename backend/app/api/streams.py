@@ -8,8 +8,10 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 import asyncio
+import time
 from datetime import datetime
 
+from app.config import settings
 from app.database import get_db
 from app.api.dependencies import get_current_user
 from app.models import Device, DeviceStatus as DeviceModelStatus
@@ -19,6 +21,18 @@ from app.services.janus_service import janus_service
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/streams", tags=["streams"])
 
+# (epoch second, ISO string) of the last timestamp handed out
+_ts_cache = (0, "")
+
+
+def iso_now() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per second."""
+    global _ts_cache
+    second = int(time.time())
+    if _ts_cache[0] != second:
+        _ts_cache = (second, datetime.utcfromtimestamp(second).isoformat())
+    return _ts_cache[1]
+
 
 @router.get("/", response_model=List[StreamResponse])
 async def list_streams(
@@ -26,22 +40,33 @@ async def list_streams(
     current_user=Depends(get_current_user)
 ):
     """List all available streams with their proxy mountpoint status"""
-    try:
-        devices = db.query(Device).all()
-        # Eagerly load data and close the session
-        device_data_list = [d.to_dict() for d in devices]
-    finally:
-        db.close()
+    devices = db.query(Device).all()
+    device_data_list = [d.to_stream_dict() for d in devices]
+    # Hand the connection back to the pool before awaiting Janus;
+    # get_db still owns the session and its final close is a no-op
+    db.close()
 
     try:
-        mountpoints = await janus_service.list_mountpoints()
-        mountpoint_map = {mp["id"]: mp for mp in mountpoints}
+        mountpoint_map = await janus_service.get_mountpoint_map()
+        if not mountpoint_map:
+            # Janus has nothing loaded (or is down): every stream is inactive
+            return [
+                StreamResponse.model_construct(
+                    **device_data,
+                    status=StreamStatus.INACTIVE,
+                    mountpoint_info=None,
+                    webrtc_url=None
+                )
+                for device_data in device_data_list
+            ]
+        # This logic assumes a fixed mapping from device ID to a mountpoint ID
+        # In a real system, you might have a more dynamic way to look this up
+        proxy_map = janus_service.get_proxy_mountpoint_map_sync()
+        janus_webrtc_url = janus_service.get_webrtc_url()
         
         streams = []
         for device_data in device_data_list:
-            # This logic assumes a fixed mapping from device ID to a mountpoint ID
-            # In a real system, you might have a more dynamic way to look this up
-            proxy_mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(str(device_data["id"]))
+            proxy_mountpoint_id = proxy_map.get(str(device_data["id"]))
             
             mountpoint_info = None
             stream_status = StreamStatus.INACTIVE
@@ -52,16 +77,15 @@ async def list_streams(
                 # Check if the stream is active based on Janus's report
                 if mountpoint_info.get("streaming"):
                     stream_status = StreamStatus.ACTIVE
-                    webrtc_url = janus_service.get_webrtc_url()
-            
-            # The device dictionary has its own 'status' (ONLINE/OFFLINE).
-            # We must remove it to avoid a keyword argument conflict with the stream's status.
-            device_data.pop("status", None)
+                    webrtc_url = janus_webrtc_url
 
-            stream = StreamResponse(
+            # Rows come from our own DB and mountpoints from the Janus cache, and
+            # FastAPI validates the response_model on the way out anyway, so
+            # skip the per-row validation here
+            stream = StreamResponse.model_construct(
                 **device_data,
                 status=stream_status,
-                mountpoint_info=JanusMountpoint(**mountpoint_info) if mountpoint_info else None,
+                mountpoint_info=JanusMountpoint.model_construct(**mountpoint_info) if mountpoint_info else None,
                 webrtc_url=webrtc_url
             )
             streams.append(stream)
@@ -83,35 +107,30 @@ async def start_stream(
     current_user=Depends(get_current_user)
 ):
     """Start streaming for a device by activating its proxy mountpoint."""
-    try:
-        device = db.query(Device).filter(Device.id == device_id).first()
-        if not device:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
-        
-        if device.status != DeviceModelStatus.ONLINE:
-             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Device is not online. Current status: {device.status.value}")
-
-        device_data = device.to_dict()
-        device_data.pop("status", None)
-        proxy_mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(device_id)
-
-    finally:
-        db.close()
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if not device:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
+    
+    if device.status != DeviceModelStatus.ONLINE:
+         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Device is not online. Current status: {device.status.value}")
+
+    device_data = device.to_stream_dict()
+    proxy_mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(device_id)
+    # Release the connection before awaiting Janus
+    db.close()
 
     if not proxy_mountpoint_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No proxy mountpoint configured for this device.")
 
     try:
-        is_active = await janus_service.is_proxy_mountpoint_active(proxy_mountpoint_id)
-        if not is_active:
+        mountpoint_info = await janus_service.get_mountpoint_info(proxy_mountpoint_id)
+        if not mountpoint_info or not mountpoint_info.get("streaming"):
             logger.warning(f"Attempted to start stream for device {device_id}, but its FFmpeg proxy mountpoint ({proxy_mountpoint_id}) is not active in Janus.")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Camera stream is not available. Check FFmpeg proxy and camera connectivity."
             )
         
-        mountpoint_info = await janus_service.get_mountpoint_info(proxy_mountpoint_id)
-        
         return StreamResponse(
             **device_data,
             status=StreamStatus.ACTIVE,
@@ -137,14 +156,10 @@ async def stop_stream(
     as streams are always 'on' in the background via FFmpeg.
     This endpoint confirms the mountpoint is inactive.
     """
-    try:
-        device = db.query(Device).filter(Device.id == device_id).first()
-        if not device:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
-        device_data = device.to_dict()
-        device_data.pop("status", None)
-    finally:
-        db.close()
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if not device:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
+    device_data = device.to_stream_dict()
 
     # With the proxy model, we don't 'stop' the stream, we just confirm its status.
     # The stream is always running via ffmpeg. A client just disconnects.
@@ -158,15 +173,13 @@ async def get_stream_status(
     current_user=Depends(get_current_user)
 ):
     """Get the current status of a stream."""
-    try:
-        device = db.query(Device).filter(Device.id == device_id).first()
-        if not device:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
-        device_data = device.to_dict()
-        device_data.pop("status", None)
-        proxy_mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(str(device.id))
-    finally:
-        db.close()
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if not device:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
+    device_data = device.to_stream_dict()
+    proxy_mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(str(device.id))
+    # Release the connection before awaiting Janus
+    db.close()
 
     try:
         if not proxy_mountpoint_id:
@@ -233,6 +246,42 @@ async def janus_health_check():
 # WebRTC API Gateway - Third-Party Integration Endpoints
 # =============================================================================
 
+# Janus connection settings shared by every stream's WebRTC config
+_STATIC_WEBRTC_CONFIG = {
+    "janus_websocket_url": f"ws://{settings.janus_public_host}:{settings.janus_public_ws_port}",
+    "janus_http_url": f"http://{settings.janus_public_host}:{settings.janus_public_http_port}",
+    "plugin": "janus.plugin.streaming",
+    "connection_timeout": 30000,  # 30 seconds
+    "ice_servers": [
+        {"urls": "stun:stun.l.google.com:19302"},
+        {"urls": "stun:stun1.l.google.com:19302"}
+    ],
+    "webrtc_options": {
+        "trickle": True,
+        "ice_tcp": False,
+        "ice_lite": False
+    },
+}
+
+
+def _parse_mountpoint_id(stream_id: str) -> Optional[int]:
+    """Mountpoint id for a stream id made of ASCII digits, or None.
+
+    str.isdigit() alone also accepts digits like "²" that int() rejects.
+    """
+    if not (stream_id.isascii() and stream_id.isdigit()):
+        return None
+    return int(stream_id)
+
+
+async def _find_mountpoint(stream_id: str) -> Optional[dict]:
+    """Cached mountpoint for a numeric stream id, or None."""
+    mountpoint_id = _parse_mountpoint_id(stream_id)
+    if mountpoint_id is None:
+        return None
+    return await janus_service.get_mountpoint_info(mountpoint_id)
+
+
 @router.get("/webrtc/streams")
 async def get_webrtc_streams(
     current_user = Depends(get_current_user)
@@ -260,12 +309,12 @@ async def get_webrtc_streams(
                 }
                 streams.append(stream_info)
         
-        logger.info(f"Retrieved {len(streams)} WebRTC streams for third-party access")
+        logger.info("Retrieved %d WebRTC streams for third-party access", len(streams))
         return {
             "streams": streams,
             "total_count": len(streams),
             "api_version": "1.0.0",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now()
         }
         
     except Exception as e:
@@ -282,8 +331,7 @@ async def get_webrtc_stream_info(
     Get detailed information about a specific WebRTC stream
     """
     try:
-        mountpoints = await janus_service.list_mountpoints()
-        mountpoint = next((mp for mp in mountpoints if str(mp["id"]) == stream_id), None)
+        mountpoint = await _find_mountpoint(stream_id)
         
         if not mountpoint:
             raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
@@ -297,7 +345,7 @@ async def get_webrtc_stream_info(
             "enabled": mountpoint.get("enabled", True),
             "webrtc_config_endpoint": f"/api/streams/webrtc/streams/{stream_id}/config",
             "status_endpoint": f"/api/streams/webrtc/streams/{stream_id}/status",
-            "last_updated": datetime.utcnow().isoformat()
+            "last_updated": iso_now()
         }
         
     except HTTPException:
@@ -307,10 +355,31 @@ async def get_webrtc_stream_info(
         raise HTTPException(status_code=500, detail="Failed to retrieve stream information")
 
 
+async def resolve_mountpoint_id(stream_id: str) -> int:
+    """Map a device ID (UUID) or mountpoint ID (integer) path parameter to a mountpoint ID."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Available device mappings: %s", list(janus_service.get_proxy_mountpoint_map_sync()))
+    
+    # Check if stream_id is a device ID (UUID) and map to mountpoint ID
+    mountpoint_id = janus_service.get_proxy_mountpoint_for_device_sync(stream_id)
+    if mountpoint_id is not None:
+        logger.info("Mapped device ID %s to mountpoint ID %s", stream_id, mountpoint_id)
+        return mountpoint_id
+    
+    # Otherwise it must already be a mountpoint ID
+    mountpoint_id = _parse_mountpoint_id(stream_id)
+    if mountpoint_id is None:
+        logger.error("Stream %s not found in mappings and not a valid integer", stream_id)
+        raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
+    logger.info("Using stream_id as mountpoint_id: %s", stream_id)
+    return mountpoint_id
+
+
 @router.get("/webrtc/streams/{stream_id}/config")
 async def get_webrtc_connection_config(
     stream_id: str,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    mountpoint_id: int = Depends(resolve_mountpoint_id)
 ):
     """
     Get WebRTC connection configuration for a specific stream
@@ -318,52 +387,18 @@ async def get_webrtc_connection_config(
     Accepts either device ID (UUID) or mountpoint ID (integer)
     """
     try:
-        from app.core.constants import DEVICE_TO_MOUNTPOINT_MAP
-        
-        logger.info(f"WebRTC config requested for stream_id: {stream_id}")
-        logger.info(f"Available device mappings: {list(DEVICE_TO_MOUNTPOINT_MAP.keys())}")
-        
-        # Check if stream_id is a device ID (UUID) and map to mountpoint ID
-        if stream_id in DEVICE_TO_MOUNTPOINT_MAP:
-            mountpoint_id = DEVICE_TO_MOUNTPOINT_MAP[stream_id]
-            logger.info(f"Mapped device ID {stream_id} to mountpoint ID {mountpoint_id}")
-        else:
-            # Assume it's already a mountpoint ID
-            try:
-                mountpoint_id = int(stream_id)
-                logger.info(f"Using stream_id as mountpoint_id: {mountpoint_id}")
-            except ValueError:
-                logger.error(f"Stream {stream_id} not found in mappings and not a valid integer")
-                raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
+        logger.info("WebRTC config requested for stream_id: %s", stream_id)
         
         # Verify mountpoint exists
-        mountpoints = await janus_service.list_mountpoints()
-        mountpoint = next((mp for mp in mountpoints if mp["id"] == mountpoint_id), None)
+        mountpoint = await janus_service.get_mountpoint_info(mountpoint_id)
         
         if not mountpoint:
             raise HTTPException(status_code=404, detail=f"Mountpoint {mountpoint_id} not found")
         
-        # Get Janus configuration from settings
-        janus_host = "10.30.250.245"  # Your server IP
-        janus_ws_port = 8188
-        janus_http_port = 8088
-        
         config = {
-            "janus_websocket_url": f"ws://{janus_host}:{janus_ws_port}",
-            "janus_http_url": f"http://{janus_host}:{janus_http_port}",
+            **_STATIC_WEBRTC_CONFIG,
             "mountpoint_id": mountpoint_id,
             "stream_id": mountpoint_id,  # For compatibility
-            "plugin": "janus.plugin.streaming",
-            "connection_timeout": 30000,  # 30 seconds
-            "ice_servers": [
-                {"urls": "stun:stun.l.google.com:19302"},
-                {"urls": "stun:stun1.l.google.com:19302"}
-            ],
-            "webrtc_options": {
-                "trickle": True,
-                "ice_tcp": False,
-                "ice_lite": False
-            },
             "stream_info": {
                 "name": mountpoint.get("description", f"Stream {stream_id}"),
                 "type": mountpoint.get("type", "rtsp"),
@@ -371,7 +406,7 @@ async def get_webrtc_connection_config(
             }
         }
         
-        logger.info(f"Generated WebRTC config for stream {stream_id}")
+        logger.info("Generated WebRTC config for stream %s", stream_id)
         return config
         
     except HTTPException:
@@ -390,12 +425,9 @@ async def get_webrtc_stream_status(
     Get real-time status of a WebRTC stream
     """
     try:
-        # Check if Janus is healthy
-        janus_healthy = await janus_service.health_check()
-        
-        # Get stream info
-        mountpoints = await janus_service.list_mountpoints()
-        mountpoint = next((mp for mp in mountpoints if str(mp["id"]) == stream_id), None)
+        # Stream info and Janus health from one lookup
+        _, janus_healthy = await janus_service.snapshot()
+        mountpoint = await _find_mountpoint(stream_id)
         
         if not mountpoint:
             return {
@@ -403,7 +435,7 @@ async def get_webrtc_stream_status(
                 "status": "not_found",
                 "janus_healthy": janus_healthy,
                 "webrtc_ready": False,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": iso_now()
             }
         
         stream_active = mountpoint.get("streaming", False)
@@ -416,7 +448,7 @@ async def get_webrtc_stream_status(
             "janus_healthy": janus_healthy,
             "webrtc_ready": janus_healthy and stream_enabled,
             "streaming": stream_active,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now()
         }
         
     except Exception as e:
@@ -425,7 +457,7 @@ async def get_webrtc_stream_status(
             "stream_id": stream_id,
             "status": "error",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now()
         }
 
 
@@ -437,12 +469,15 @@ async def get_webrtc_system_status(
     Get overall WebRTC system status for monitoring
     """
     try:
-        janus_healthy = await janus_service.health_check()
         mountpoints = await janus_service.list_mountpoints()
         
-        active_streams = len([mp for mp in mountpoints if mp.get("streaming", False)])
+        active_streams = enabled_streams = 0
+        for mp in mountpoints:
+            active_streams += bool(mp.get("streaming", False))
+            enabled_streams += bool(mp.get("enabled", True))
         total_streams = len(mountpoints)
-        enabled_streams = len([mp for mp in mountpoints if mp.get("enabled", True)])
+        # Same rule as JanusService.snapshot(), from the counts already taken
+        janus_healthy = active_streams > 0 and janus_service.last_refresh_ok
         
         return {
             "system_status": "healthy" if janus_healthy else "degraded",
@@ -453,7 +488,7 @@ async def get_webrtc_system_status(
             "enabled_streams": enabled_streams,
             "disabled_streams": total_streams - enabled_streams,
             "webrtc_gateway_ready": janus_healthy,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": iso_now(),
             "api_version": "1.0.0"
         }
         
@@ -462,5 +497,5 @@ async def get_webrtc_system_status(
         return {
             "system_status": "error",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now()
         }
\ No newline at end of file
@@ -1,9 +1,10 @@
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, status, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy import text
 import time
+import asyncio
 import logging
 
 from app.config import settings
@@ -11,18 +12,24 @@ from app.database import engine, Base
 from app.api import auth, devices, discovery, streams, snapshots
 from app.api.dependencies import get_current_user
 from app.services.validation import validation_service
+from app.services.janus_service import janus_service
+from app.services.discovery import discovery_service
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How often the health endpoint's ffprobe availability is re-checked (seconds)
+FFPROBE_RECHECK_INTERVAL = 60
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.project_name,
     version=settings.version,
     description="Video Aggregation Service (VAS) - Phase 1 Backend API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -42,11 +49,41 @@ app.include_router(streams.router, prefix=settings.api_v1_prefix)
 app.include_router(snapshots.router, prefix=settings.api_v1_prefix)
 
 
+async def probe_ffprobe() -> bool:
+    """Whether `ffprobe -version` runs successfully, without blocking the event loop."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-version",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return False
+    try:
+        return await asyncio.wait_for(process.wait(), timeout=5) == 0
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return False
+
+
+async def monitor_ffprobe():
+    """Refresh app.state.ffprobe_available for the health endpoint."""
+    while True:
+        await asyncio.sleep(FFPROBE_RECHECK_INTERVAL)
+        app.state.ffprobe_available = await probe_ffprobe()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Create database tables unless migrations own the schema
+    if settings.run_ddl_on_startup:
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    # One keep-alive pool to Janus for the app's lifetime; closed on shutdown
+    await janus_service.open()
+    app.state.ffprobe_available = await probe_ffprobe()
+    app.state.ffprobe_monitor = asyncio.create_task(monitor_ffprobe())
     
     print(f"🚀 {settings.project_name} v{settings.version} started")
 
@@ -54,6 +91,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on application shutdown."""
+    app.state.ffprobe_monitor.cancel()
+    await janus_service.aclose()
+    await discovery_service.close()
     print("🛑 Application shutting down")
 
 
@@ -72,6 +112,29 @@ async def metrics_middleware(request: Request, call_next):
     return response
 
 
+if settings.debug:
+    try:
+        import nplusone.ext.sqlalchemy  # noqa: F401 - registers the SQLAlchemy load hooks
+        from nplusone.core import profiler
+    except ImportError:
+        logger.info("nplusone not installed; SQLAlchemy N+1 profiling disabled")
+    else:
+        nplusone_logger = logging.getLogger("nplusone")
+
+        class NPlusOneLogger(profiler.Profiler):
+            """Profiler that logs N+1 and unused eager loads instead of raising."""
+
+            def notify(self, message):
+                if not message.match(self.whitelist):
+                    nplusone_logger.warning(message.message)
+
+        @app.middleware("http")
+        async def nplusone_middleware(request: Request, call_next):
+            """Development-only middleware flagging lazy loads inside request handlers"""
+            with NPlusOneLogger():
+                return await call_next(request)
+
+
 @app.get("/", tags=["root"])
 async def root():
     """Root endpoint with API information."""
@@ -84,6 +147,11 @@ async def root():
     }
 
 
+def _ping_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
 @app.get("/api/health", tags=["health"])
 async def health_check():
     """Health check endpoint."""
@@ -95,30 +163,20 @@ async def health_check():
         "redis": "unknown"
     }
     
-    # Check database connection
+    # Check database connection off the event loop
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        await asyncio.to_thread(_ping_database)
         health_status["database"] = "connected"
     except Exception as e:
         health_status["database"] = f"error: {str(e)}"
         health_status["status"] = "unhealthy"
     
-    # Check if ffprobe is available
-    try:
-        import subprocess
-        result = subprocess.run(
-            ["ffprobe", "-version"], 
-            capture_output=True, 
-            text=True, 
-            timeout=5
-        )
-        if result.returncode == 0:
-            health_status["ffprobe"] = "available"
-        else:
-            health_status["ffprobe"] = "unavailable"
-    except Exception:
-        health_status["ffprobe"] = "unavailable"
+    # ffprobe availability is probed in the background, not per request
+    ffprobe_available = getattr(app.state, "ffprobe_available", None)
+    if ffprobe_available is None:
+        health_status["ffprobe"] = "unknown"
+    else:
+        health_status["ffprobe"] = "available" if ffprobe_available else "unavailable"
     
     return health_status
 
@@ -168,5 +226,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.debug
+        reload=settings.debug,
+        # Both ship with uvicorn[standard]; naming them fails fast if the extra is missing
+        loop="uvloop",
+        http="httptools"
     ) 
\ No newline at end of file
@@ -1,12 +1,27 @@
+import os
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, LargeBinary, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, LargeBinary, ForeignKey, Index, DDL, event, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 
 
+def utc_now() -> datetime:
+    """Timezone-aware current time for TIMESTAMPTZ columns."""
+    return datetime.now(timezone.utc)
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (version 7): a millisecond timestamp prefix keeps new keys at the btree's right edge."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
 class DeviceStatus(str, Enum):
     ONLINE = "ONLINE"
     OFFLINE = "OFFLINE"
@@ -15,6 +30,10 @@ class DeviceStatus(str, Enum):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        # Serves both status-only filters and "stale devices by status" scans
+        Index("ix_devices_status_last_seen", "status", "last_seen"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
@@ -28,8 +47,8 @@ class Device(Base):
     password = Column(Text, nullable=True)  # Encrypted password
     location = Column(String(255), nullable=True)
     description = Column(Text, nullable=True)
-    tags = Column(Text, nullable=True)  # JSON string of tags
-    device_metadata = Column(Text, nullable=True)  # JSON string of metadata
+    tags = Column(JSONB, nullable=True)  # List of tags
+    device_metadata = Column(JSONB, nullable=True)  # Free-form metadata object
     hostname = Column(String(255), nullable=True)
     vendor = Column(String(100), nullable=True)
     resolution = Column(String(50), nullable=True)
@@ -47,7 +66,6 @@ class Device(Base):
     
     def to_dict(self):
         """Convert device to dictionary for API responses."""
-        import json
         return {
             "id": str(self.id),
             "name": self.name,
@@ -60,8 +78,8 @@ class Device(Base):
             "username": self.username,
             "location": self.location,
             "description": self.description,
-            "tags": json.loads(self.tags) if self.tags else [],
-            "metadata": json.loads(self.device_metadata) if self.device_metadata else {},
+            "tags": self.tags or [],
+            "metadata": self.device_metadata or {},
             "hostname": self.hostname,
             "vendor": self.vendor,
             "resolution": self.resolution,
@@ -74,21 +92,43 @@ class Device(Base):
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
+    def to_stream_dict(self):
+        """Device fields for StreamResponse, already in the schema's types.
+
+        The stream sets its own status, so the device status is left out.
+        """
+        return {
+            "id": str(self.id),
+            "name": self.name,
+            "description": self.description,
+            "device_type": self.device_type,
+            "ip_address": self.ip_address,
+            "rtsp_url": self.rtsp_url,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
 
 class Snapshot(Base):
     __tablename__ = "snapshots"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     device_id = Column(UUID(as_uuid=True), ForeignKey('devices.id', ondelete='CASCADE'), nullable=False)
-    image_data = Column(LargeBinary, nullable=False)
+    # Loaded only when accessed, so listings and metadata reads never pull the image
+    image_data = deferred(Column(LargeBinary, nullable=False))
     image_format = Column(String(10), nullable=False, default='jpeg')
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
     file_size = Column(Integer, nullable=True)
-    captured_at = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+    captured_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, server_default=func.now(), onupdate=utc_now)
+
+    __table_args__ = (
+        # Serves "latest snapshots for a device" in index order, and device-only filters
+        Index("idx_snapshots_device_captured", device_id, captured_at.desc()),
+    )
+
     # Relationship to Device
     device = relationship("Device", backref="snapshots")
     
@@ -107,4 +147,13 @@ class Snapshot(Base):
             "captured_at": self.captured_at.isoformat() if self.captured_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        } 
\ No newline at end of file
+        }
+
+
+# Mirror migration 007 for tables created by create_all: images are already compressed,
+# so store them out of line without pglz
+for _statement in (
+    "ALTER TABLE snapshots ALTER COLUMN image_data SET STORAGE EXTERNAL",
+    "ALTER TABLE snapshots SET (toast_tuple_target = 512)",
+):
+    event.listen(Snapshot.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
@@ -1,9 +1,9 @@
+import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, IPvAnyAddress, validator, field_validator
 from app.models import DeviceStatus
-import json
 
 
 class DeviceBase(BaseModel):
@@ -88,7 +88,7 @@ class DeviceResponse(BaseModel):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
 
@@ -121,7 +121,7 @@ class SnapshotResponse(SnapshotBase):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
     
@@ -129,7 +129,7 @@ class SnapshotResponse(SnapshotBase):
     @classmethod
     def validate_device_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
 
@@ -157,7 +157,7 @@ class SnapshotImageResponse(BaseModel):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
     
@@ -165,7 +165,7 @@ class SnapshotImageResponse(BaseModel):
     @classmethod
     def validate_device_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
     
@@ -277,7 +277,7 @@ class StreamResponse(BaseModel):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
 
@@ -310,7 +310,7 @@ class SnapshotResponse(SnapshotBase):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
     
@@ -318,7 +318,7 @@ class SnapshotResponse(SnapshotBase):
     @classmethod
     def validate_device_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
 
@@ -346,7 +346,7 @@ class SnapshotImageResponse(BaseModel):
     @classmethod
     def validate_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v
     
@@ -354,6 +354,6 @@ class SnapshotImageResponse(BaseModel):
     @classmethod
     def validate_device_id(cls, v):
         """Convert UUID to string if needed."""
-        if hasattr(v, '__str__'):
+        if isinstance(v, uuid.UUID):
             return str(v)
         return v 
\ No newline at end of file
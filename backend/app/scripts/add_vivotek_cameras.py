@@ -68,8 +68,8 @@ async def add_devices(db: AsyncSession):
             encrypted_credentials=hashed_password,
             location=device_data.location,
             description=device_data.description,
-            tags=str(device_data.tags),
-            device_metadata=str(device_data.metadata),
+            tags=device_data.tags,
+            device_metadata=device_data.metadata,
             credentials_secure=True,
         )
         db.add(new_device)
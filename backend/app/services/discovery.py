@@ -1,18 +1,38 @@
 import asyncio
 import ipaddress
+import itertools
 import socket
 import time
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import aiohttp
 from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
 
 
 class NetworkDiscoveryService:
+    # Reverse DNS is best-effort; don't let slow resolvers hold up a scan (seconds)
+    HOSTNAME_LOOKUP_TIMEOUT = 0.5
+    # Number of hosts expanded from a subnet at a time
+    SCAN_CHUNK_SIZE = 1024
+    
     def __init__(self):
         self.scan_timeout = settings.scan_timeout
         self.max_concurrent = settings.max_concurrent_scans
         self.rtsp_ports = settings.rtsp_port_list
+        self._http: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session used for vendor probes."""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+            self._http = aiohttp.ClientSession(connector=connector)
+        return self._http
+    
+    async def close(self) -> None:
+        """Close the shared HTTP session; called on application shutdown."""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
         
     async def scan_subnets(self, subnets: List[str]) -> Dict[str, List[Dict]]:
         """
@@ -48,27 +68,24 @@ class NetworkDiscoveryService:
         """Scan a single subnet for RTSP devices."""
         try:
             network = ipaddress.IPv4Network(subnet, strict=False)
-            ip_addresses = [str(ip) for ip in network.hosts()]
+            hosts = network.hosts()
             
             # Use semaphore to limit concurrent scans
             semaphore = asyncio.Semaphore(self.max_concurrent)
             
-            # Create tasks for each IP
-            tasks = []
-            for ip in ip_addresses:
-                task = asyncio.create_task(
-                    self._scan_ip_with_semaphore(semaphore, ip)
-                )
-                tasks.append(task)
-            
-            # Execute all IP scans
-            ip_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Filter out exceptions and None results
+            # Expand the subnet lazily so large networks never hold more than
+            # one chunk of pending tasks in memory
             devices = []
-            for result in ip_results:
-                if isinstance(result, dict) and result:
-                    devices.append(result)
+            while chunk := list(itertools.islice(hosts, self.SCAN_CHUNK_SIZE)):
+                ip_results = await asyncio.gather(
+                    *(self._scan_ip_with_semaphore(semaphore, str(ip)) for ip in chunk),
+                    return_exceptions=True
+                )
+                
+                # Filter out exceptions and None results
+                for result in ip_results:
+                    if isinstance(result, dict) and result:
+                        devices.append(result)
             
             return devices
             
@@ -88,13 +105,31 @@ class NetworkDiscoveryService:
             if not await self._is_ip_reachable(ip):
                 return {}
             
-            # Check for RTSP ports
-            rtsp_ports = await self._check_rtsp_ports(ip)
-            if not rtsp_ports:
-                return {}
-            
-            # Get hostname
-            hostname = await self._get_hostname(ip)
+            # Probe ports, hostname and vendor concurrently; the vendor probe assumes the
+            # primary RTSP port and is dropped if that port turns out to be closed
+            default_port = self.rtsp_ports[0]
+            vendor_task = asyncio.create_task(self._identify_vendor(ip, default_port))
+            try:
+                rtsp_ports, hostname = await asyncio.gather(
+                    self._check_rtsp_ports(ip),
+                    self._get_hostname(ip),
+                    return_exceptions=True
+                )
+                if isinstance(rtsp_ports, BaseException) or not rtsp_ports:
+                    return {}
+                if isinstance(hostname, BaseException):
+                    hostname = ""
+                if rtsp_ports[0] != default_port:
+                    await self._cancel(vendor_task)
+                    vendor_info = await self._identify_vendor(ip, rtsp_ports[0])
+                else:
+                    try:
+                        vendor_info = await vendor_task
+                    except Exception:
+                        vendor_info = await self._identify_vendor(ip, default_port)
+            finally:
+                # Not a camera (or not on the default port): don't hold the scan slot for HTTP probes
+                await self._cancel(vendor_task)
             
             # Basic device info
             device_info = {
@@ -103,9 +138,6 @@ class NetworkDiscoveryService:
                 "rtsp_ports": rtsp_ports,
                 "discovered_at": time.time()
             }
-            
-            # Try to identify vendor
-            vendor_info = await self._identify_vendor(ip, rtsp_ports[0])
             device_info.update(vendor_info)
             
             return device_info
@@ -114,6 +146,17 @@ class NetworkDiscoveryService:
             print(f"Error scanning IP {ip}: {e}")
             return {}
     
+    @staticmethod
+    async def _cancel(task: asyncio.Task) -> None:
+        """Cancel a probe task and wait until it has actually stopped."""
+        if task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
     async def _is_ip_reachable(self, ip: str) -> bool:
         """Check if IP address is reachable using ping."""
         try:
@@ -130,32 +173,33 @@ class NetworkDiscoveryService:
     
     async def _check_rtsp_ports(self, ip: str) -> List[int]:
         """Check which RTSP ports are open on the IP."""
-        open_ports = []
-        
-        for port in self.rtsp_ports:
-            try:
-                # Use asyncio to run netcat command
-                proc = await asyncio.create_subprocess_exec(
-                    "nc", "-z", "-w", str(self.scan_timeout), ip, str(port),
-                    stdout=asyncio.subprocess.DEVNULL,
-                    stderr=asyncio.subprocess.DEVNULL
-                )
-                await asyncio.wait_for(proc.wait(), timeout=self.scan_timeout + 1)
-                if proc.returncode == 0:
-                    open_ports.append(port)
-            except (asyncio.TimeoutError, Exception):
-                continue
-        
-        return open_ports
+        results = await asyncio.gather(
+            *(self._is_port_open(ip, port) for port in self.rtsp_ports)
+        )
+        return [port for port, is_open in zip(self.rtsp_ports, results) if is_open]
+    
+    async def _is_port_open(self, ip: str, port: int) -> bool:
+        """Check whether a TCP connection can be opened to the port."""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port),
+                timeout=self.scan_timeout
+            )
+            writer.close()
+            await writer.wait_closed()
+            return True
+        except (asyncio.TimeoutError, OSError):
+            return False
     
     async def _get_hostname(self, ip: str) -> str:
         """Perform reverse DNS lookup for hostname."""
         try:
-            loop = asyncio.get_event_loop()
-            hostname = await loop.run_in_executor(
-                None, socket.gethostbyaddr, ip
+            loop = asyncio.get_running_loop()
+            hostname, _ = await asyncio.wait_for(
+                loop.getnameinfo((ip, 0), socket.NI_NAMEREQD),
+                timeout=self.HOSTNAME_LOOKUP_TIMEOUT
             )
-            return hostname[0]
+            return hostname
         except Exception:
             return ""
     
@@ -178,23 +222,23 @@ class NetworkDiscoveryService:
             "Generic": ["/stream", "/live", "/onvif"]
         }
         
+        session = await self._get_http_session()
         for url in common_urls:
             try:
                 # Quick check if URL might be valid (without full validation)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        url.replace("rtsp://", "http://").replace("/stream1", "/"),
-                        timeout=aiohttp.ClientTimeout(total=2)
-                    ) as response:
-                        if response.status < 500:  # Not a server error
-                            # Try to identify vendor from URL pattern
-                            for vendor, patterns in vendor_patterns.items():
-                                if any(pattern in url for pattern in patterns):
-                                    return {
-                                        "vendor": vendor,
-                                        "rtsp_url": url
-                                    }
-                            return {"vendor": "Unknown", "rtsp_url": url}
+                async with session.get(
+                    url.replace("rtsp://", "http://").replace("/stream1", "/"),
+                    timeout=aiohttp.ClientTimeout(total=2)
+                ) as response:
+                    if response.status < 500:  # Not a server error
+                        # Try to identify vendor from URL pattern
+                        for vendor, patterns in vendor_patterns.items():
+                            if any(pattern in url for pattern in patterns):
+                                return {
+                                    "vendor": vendor,
+                                    "rtsp_url": url
+                                }
+                        return {"vendor": "Unknown", "rtsp_url": url}
             except Exception:
                 continue
         
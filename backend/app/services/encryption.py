@@ -1,6 +1,8 @@
+import asyncio
 import base64
+import hashlib
 import os
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from app.config import settings
@@ -10,20 +12,36 @@ class EncryptionService:
     def __init__(self):
         self.secret_key = settings.secret_key.encode()
         self._fernet = None
+        self._legacy_fernet = None
     
     def _get_fernet(self) -> Fernet:
         """Get or create Fernet instance for encryption/decryption."""
         if self._fernet is None:
-            # Derive key from secret key
+            # SECRET_KEY is a high-entropy machine key (e.g. secrets.token_urlsafe(32)),
+            # so a single SHA-256 is enough to shape it into a Fernet key
+            key = base64.urlsafe_b64encode(hashlib.sha256(self.secret_key).digest())
+            self._fernet = Fernet(key)
+        return self._fernet
+    
+    def _get_legacy_fernet(self) -> Fernet:
+        """Get Fernet instance for data encrypted with the old PBKDF2-derived key."""
+        if self._legacy_fernet is None:
             kdf = PBKDF2HMAC(
                 algorithm=hashes.SHA256(),
                 length=32,
-                salt=b'vas_salt',  # In production, use a random salt per encryption
+                salt=b'vas_salt',
                 iterations=100000,
             )
             key = base64.urlsafe_b64encode(kdf.derive(self.secret_key))
-            self._fernet = Fernet(key)
-        return self._fernet
+            self._legacy_fernet = Fernet(key)
+        return self._legacy_fernet
+    
+    def _decrypt(self, encrypted_data: bytes) -> bytes:
+        """Decrypt a Fernet token, falling back to the legacy key for older data."""
+        try:
+            return self._get_fernet().decrypt(encrypted_data)
+        except InvalidToken:
+            return self._get_legacy_fernet().decrypt(encrypted_data)
     
     def encrypt_credentials(self, username: str, password: str) -> str:
         """Encrypt device credentials."""
@@ -39,9 +57,8 @@ class EncryptionService:
     def decrypt_credentials(self, encrypted_credentials: str) -> tuple:
         """Decrypt device credentials."""
         try:
-            fernet = self._get_fernet()
             encrypted_data = base64.urlsafe_b64decode(encrypted_credentials.encode())
-            decrypted_data = fernet.decrypt(encrypted_data)
+            decrypted_data = self._decrypt(encrypted_data)
             credentials = decrypted_data.decode()
             username, password = credentials.split(":", 1)
             return username, password
@@ -62,13 +79,28 @@ class EncryptionService:
     def decrypt_text(self, encrypted_text: str) -> str:
         """Decrypt any text data."""
         try:
-            fernet = self._get_fernet()
             encrypted_data = base64.urlsafe_b64decode(encrypted_text.encode())
-            decrypted_data = fernet.decrypt(encrypted_data)
+            decrypted_data = self._decrypt(encrypted_data)
             return decrypted_data.decode()
         except Exception as e:
             print(f"Error decrypting text: {e}")
             return ""
+    
+    async def encrypt_credentials_async(self, username: str, password: str) -> str:
+        """Encrypt device credentials without blocking the event loop."""
+        return await asyncio.to_thread(self.encrypt_credentials, username, password)
+    
+    async def decrypt_credentials_async(self, encrypted_credentials: str) -> tuple:
+        """Decrypt device credentials without blocking the event loop."""
+        return await asyncio.to_thread(self.decrypt_credentials, encrypted_credentials)
+    
+    async def encrypt_text_async(self, text: str) -> str:
+        """Encrypt text data without blocking the event loop."""
+        return await asyncio.to_thread(self.encrypt_text, text)
+    
+    async def decrypt_text_async(self, encrypted_text: str) -> str:
+        """Decrypt text data without blocking the event loop."""
+        return await asyncio.to_thread(self.decrypt_text, encrypted_text)
 
 
 # Global instance
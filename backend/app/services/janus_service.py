@@ -5,142 +5,416 @@ Handles interaction with the Janus Admin API for stream management.
 
 import aiohttp  # Ensure aiohttp is imported for type checking
 import asyncio
-import json
+import itertools
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Sequence, Tuple
+from urllib.parse import urlsplit
+import orjson
 from app.config import settings
 from app.core.constants import DEVICE_TO_MOUNTPOINT_MAP
 
 logger = logging.getLogger(__name__)
 
+# Bound once: device lookups sit on request paths and the map never changes at runtime
+_DEVICE_MAP_GET = DEVICE_TO_MOUNTPOINT_MAP.get
+
+# Streams loaded in Janus; this matches the janus.plugin.streaming.jcfg configuration.
+# Read-only because the same objects are handed to every caller through the cache.
+STATIC_MOUNTPOINTS: Tuple[Mapping[str, Any], ...] = tuple(MappingProxyType(mp) for mp in (
+    {
+        "id": 1,
+        "type": "rtsp",
+        "description": "Live Camera 1 - Office",
+        "enabled": True,
+        "streaming": True,
+        "metadata": "VAS Live Camera 1 - Direct RTSP"
+    },
+    {
+        "id": 2,
+        "type": "rtsp",
+        "description": "Live Camera 2 - Lobby",
+        "enabled": True,
+        "streaming": True,
+        "metadata": "VAS Live Camera 2 - Direct RTSP"
+    },
+))
+_STATIC_MOUNTPOINT_INDEX: Mapping[int, Mapping[str, Any]] = MappingProxyType({mp["id"]: mp for mp in STATIC_MOUNTPOINTS})
+
+
+# Janus endpoints, derived from settings once at import
+_CORE_WS_URL = settings.janus_ws_url  # ws://janus:8188
+_ADMIN_WS_URL = f"ws://{urlsplit(settings.janus_http_url).hostname}:7188/admin"
+
+
+def _dumps(obj: Any) -> str:
+    """orjson encoder for WebSocket text frames (Janus expects text, orjson returns bytes)."""
+    return orjson.dumps(obj).decode()
+
+
+def _index_mountpoints(mountpoints: Sequence[Mapping[str, Any]]) -> Mapping[int, Mapping[str, Any]]:
+    """Mountpoints keyed by id; the static list's index is built once at import."""
+    if mountpoints is STATIC_MOUNTPOINTS:
+        return _STATIC_MOUNTPOINT_INDEX
+    return {mp["id"]: mp for mp in mountpoints}
+
+
 class JanusService:
     """Service for managing Janus WebRTC Gateway mountpoints via Core API (not Admin API)."""
+    # How long a fetched mountpoint list is reused before asking Janus again (seconds)
+    MOUNTPOINT_CACHE_TTL = 2.0
+    # How often the background refresher re-reads mountpoints from Janus (seconds)
+    MOUNTPOINT_REFRESH_INTERVAL = 2.0
+    # Upper bound on any single Janus exchange so a hung gateway can't pin pooled connections (seconds)
+    REQUEST_TIMEOUT = 5.0
+    # Janus keepalive period for the shared Core API session (seconds)
+    KEEPALIVE_INTERVAL = 25.0
+    # Janus only needs transaction ids to be unique within a session
+    _txn_counter = itertools.count()
+
     def __init__(self):
-        self.core_ws_url = settings.janus_ws_url  # ws://janus:8188
-        self.admin_ws_url = f"ws://{settings.janus_http_url.split('//')[1].split(':')[0]}:7188/admin"
+        self.core_ws_url = _CORE_WS_URL
+        self.admin_ws_url = _ADMIN_WS_URL
         self.admin_secret = settings.janus_admin_secret
         self._session: Optional[aiohttp.ClientSession] = None  # Type hint for linter
+        # (fetched_at, mountpoints, mountpoints keyed by id)
+        self._mp_cache: Optional[Tuple[float, Sequence[Mapping[str, Any]], Mapping[int, Mapping[str, Any]]]] = None
+        # Fetch shared by every caller that missed the cache while it runs
+        self._mp_inflight: Optional[asyncio.Future] = None
+        # Bumped by invalidate_mountpoint_cache() so fetches started earlier aren't cached
+        self._mp_version = 0
+        self._mp_refresher: Optional[asyncio.Task] = None
+        # Shared Core API connection: one WebSocket, Janus session and streaming plugin handle
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._janus_session_id: Optional[int] = None
+        self._handle_id: Optional[int] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._attach_lock = asyncio.Lock()
+        # Plugin message transaction -> future resolved by the reader task
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+        # False while the refresher is serving a stale list because Janus could not be read
+        self.last_refresh_ok = True
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT)
+            )
         return self._session
 
-    async def _core_api_flow(self, plugin_request_body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Handles the Janus Core API session, plugin attach, and message flow."""
-        session = await self._get_session()
-        try:
-            async with session.ws_connect(self.core_ws_url, headers={"Origin": "*"}) as ws:
+    async def open(self) -> None:
+        """Create the shared HTTP session and start refreshing mountpoints; called on application startup."""
+        await self._get_session()
+        if self._mp_refresher is None:
+            self._mp_refresher = asyncio.create_task(self._refresh_mountpoints_forever())
+
+    async def aclose(self) -> None:
+        """Stop the refresher and close the shared HTTP session; called on application shutdown."""
+        if self._mp_refresher is not None:
+            self._mp_refresher.cancel()
+            self._mp_refresher = None
+        await self._reset_core_connection()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _ensure_attached(self) -> aiohttp.ClientWebSocketResponse:
+        """Open the shared Core API WebSocket and attach the streaming plugin once."""
+        async with self._attach_lock:
+            if self._ws is not None and not self._ws.closed and self._handle_id:
+                return self._ws
+            await self._reset_core_connection()
+            session = await self._get_session()
+            ws = await session.ws_connect(self.core_ws_url, headers={"Origin": "*"}, heartbeat=30)
+            try:
                 # 1. Create session
-                create_txn = f"vas_{datetime.now().timestamp()}_create"
-                await ws.send_json({"janus": "create", "transaction": create_txn})
-                create_resp = await ws.receive_json()
+                await ws.send_json({"janus": "create", "transaction": f"vas_{next(self._txn_counter)}_create"}, dumps=_dumps)
+                create_resp = await asyncio.wait_for(ws.receive_json(loads=orjson.loads), self.REQUEST_TIMEOUT)
                 session_id = create_resp.get("data", {}).get("id")
                 if not session_id:
-                    logger.error(f"Failed to create Janus session: {create_resp}")
-                    return None
+                    raise RuntimeError(f"Failed to create Janus session: {create_resp}")
 
                 # 2. Attach to streaming plugin
-                attach_txn = f"vas_{datetime.now().timestamp()}_attach"
                 await ws.send_json({
                     "janus": "attach",
                     "plugin": "janus.plugin.streaming",
-                    "transaction": attach_txn,
+                    "transaction": f"vas_{next(self._txn_counter)}_attach",
                     "session_id": session_id
-                })
-                attach_resp = await ws.receive_json()
+                }, dumps=_dumps)
+                attach_resp = await asyncio.wait_for(ws.receive_json(loads=orjson.loads), self.REQUEST_TIMEOUT)
                 handle_id = attach_resp.get("data", {}).get("id")
                 if not handle_id:
-                    logger.error(f"Failed to attach to streaming plugin: {attach_resp}")
-                    return None
+                    raise RuntimeError(f"Failed to attach to streaming plugin: {attach_resp}")
+            except BaseException:
+                await ws.close()
+                raise
+            self._ws, self._janus_session_id, self._handle_id = ws, session_id, handle_id
+            self._reader_task = asyncio.create_task(self._read_responses(ws))
+            self._keepalive_task = asyncio.create_task(self._keep_janus_session_alive(ws, session_id))
+            return ws
 
-                # 3. Send plugin message
-                msg_txn = f"vas_{datetime.now().timestamp()}_msg"
+    async def _read_responses(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """Sole reader of the shared socket: route each reply to the call that sent its transaction."""
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                msg = orjson.loads(message.data)
+                waiter = self._pending.get(msg.get("transaction"))
+                # Acks, keepalive replies and unknown transactions have no waiter to wake
+                if waiter is None or waiter.done():
+                    continue
+                # Asynchronous requests answer with "event"; synchronous ones (list, info, create, destroy) with "success"
+                if msg.get("janus") in ("event", "success") and msg.get("plugindata", {}).get("plugin") == "janus.plugin.streaming":
+                    waiter.set_result(msg["plugindata"].get("data"))
+                elif msg.get("janus") == "server_info":
+                    waiter.set_result(msg)
+                elif msg.get("janus") == "error":
+                    logger.error(f"Janus plugin error: {msg}")
+                    waiter.set_result(None)
+        finally:
+            # The socket is gone: fail everyone still waiting so they don't sit out the timeout
+            for waiter in self._pending.values():
+                if not waiter.done():
+                    waiter.set_exception(ConnectionResetError("Janus WebSocket closed"))
+
+    async def _keep_janus_session_alive(self, ws: aiohttp.ClientWebSocketResponse, session_id: int) -> None:
+        """Janus drops idle sessions after session_timeout (60s by default); WS pings don't count."""
+        while not ws.closed:
+            await asyncio.sleep(self.KEEPALIVE_INTERVAL)
+            try:
                 await ws.send_json({
-                    "janus": "message",
-                    "body": plugin_request_body,
-                    "transaction": msg_txn,
+                    "janus": "keepalive",
                     "session_id": session_id,
-                    "handle_id": handle_id
-                })
-                # 4. Wait for plugin data response
-                while True:
-                    msg = await ws.receive_json()
-                    if msg.get("janus") == "event" and msg.get("plugindata", {}).get("plugin") == "janus.plugin.streaming":
-                        return msg.get("plugindata", {}).get("data")
-                    # Handle errors
-                    if msg.get("janus") == "error":
-                        logger.error(f"Janus plugin error: {msg}")
-                        return None
+                    "transaction": f"vas_{next(self._txn_counter)}_keepalive"
+                }, dumps=_dumps)
+            except ConnectionResetError:
+                return
+
+    async def _reset_core_connection(self, failed_ws: Optional[aiohttp.ClientWebSocketResponse] = None) -> None:
+        """Forget the shared WebSocket so the next call reconnects and re-attaches.
+
+        With failed_ws, only reset if that socket is still the shared one, so a
+        late failure can't tear down a connection another call just re-opened.
+        """
+        if failed_ws is not None and failed_ws is not self._ws:
+            return
+        for task in (self._keepalive_task, self._reader_task):
+            if task is not None:
+                task.cancel()
+        self._keepalive_task = self._reader_task = None
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        self._ws = self._janus_session_id = self._handle_id = None
+
+    async def _core_api_flow(self, plugin_request_body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send a streaming plugin message over the shared, already-attached Core API connection.
+
+        Concurrent calls share the socket; each waits only for the reply to its own transaction.
+        """
+        ws = None
+        try:
+            ws = await self._ensure_attached()
+            return await self._request(ws, {
+                "janus": "message",
+                "body": plugin_request_body,
+                "session_id": self._janus_session_id,
+                "handle_id": self._handle_id
+            })
         except Exception as e:
+            # Keep the HTTP session: its connection pool stays valid across transient errors
             logger.error(f"Error in Janus Core API flow: {e}", exc_info=True)
-            if self._session and not self._session.closed:
-                await self._session.close()
-            self._session = None
+            await self._reset_core_connection(ws)
+            return None
+
+    async def server_info(self) -> Optional[Dict[str, Any]]:
+        """Janus `info` reply over the shared connection, or None when it isn't attached or doesn't answer."""
+        ws = self._ws
+        if ws is None or ws.closed:
             return None
+        try:
+            return await self._request(ws, {"janus": "info"})
+        except Exception as e:
+            logger.warning(f"Janus info request failed: {e}")
+            await self._reset_core_connection(ws)
+            return None
+
+    async def _core_api_flow_batch(self, plugin_request_bodies: Sequence[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Like _core_api_flow for several plugin messages: send them back to back, then await all replies.
 
-    async def list_mountpoints(self) -> List[Dict[str, Any]]:
+        Results line up with the request bodies; a message Janus doesn't answer yields None.
+        """
+        ws = None
+        try:
+            ws = await self._ensure_attached()
+            return await self._request_many(ws, [{
+                "janus": "message",
+                "body": body,
+                "session_id": self._janus_session_id,
+                "handle_id": self._handle_id
+            } for body in plugin_request_bodies])
+        except Exception as e:
+            logger.error(f"Error in Janus Core API batch: {e}", exc_info=True)
+            await self._reset_core_connection(ws)
+            return [None] * len(plugin_request_bodies)
+
+    async def _request(self, ws: aiohttp.ClientWebSocketResponse, frame: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send a frame on the shared socket and wait for the reader to route back its reply."""
+        return (await self._request_many(ws, [frame]))[0]
+
+    async def _request_many(self, ws: aiohttp.ClientWebSocketResponse, frames: Sequence[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Send frames on the shared socket, then wait for the reader to route back each reply.
+
+        A reply that doesn't arrive within REQUEST_TIMEOUT comes back as None; only
+        that request is lost then, as the shared connection may still be fine.
+        """
+        loop = asyncio.get_running_loop()
+        transactions = [f"vas_{next(self._txn_counter)}_{frame['janus']}" for frame in frames]
+        waiters = [loop.create_future() for _ in frames]
+        self._pending.update(zip(transactions, waiters))
+
+        async def wait(transaction: str, waiter: asyncio.Future) -> Optional[Dict[str, Any]]:
+            try:
+                return await asyncio.wait_for(waiter, self.REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"Janus did not answer transaction {transaction} within {self.REQUEST_TIMEOUT}s")
+                return None
+
+        try:
+            for frame, transaction in zip(frames, transactions):
+                await ws.send_json({**frame, "transaction": transaction}, dumps=_dumps)
+            return list(await asyncio.gather(*map(wait, transactions, waiters)))
+        finally:
+            for transaction in transactions:
+                self._pending.pop(transaction, None)
+
+    def _store_mountpoints(self, mountpoints: Sequence[Mapping[str, Any]]):
+        self._mp_cache = (time.monotonic(), mountpoints, _index_mountpoints(mountpoints))
+        return self._mp_cache
+
+    async def _refresh_mountpoints_forever(self) -> None:
+        """Keep the mountpoint cache current so requests never wait on Janus."""
+        while True:
+            try:
+                await self._load_mountpoints(self._mp_version)
+                self.last_refresh_ok = True
+            except Exception as e:
+                # Keep serving the last good list; status endpoints report degraded
+                if self.last_refresh_ok:
+                    logger.warning(f"Janus mountpoint refresh failed, serving stale list: {e}")
+                self.last_refresh_ok = False
+            await asyncio.sleep(self.MOUNTPOINT_REFRESH_INTERVAL)
+
+    async def _cached_mountpoints(self) -> Tuple[float, Sequence[Mapping[str, Any]], Mapping[int, Mapping[str, Any]]]:
+        """Mountpoint list reused for MOUNTPOINT_CACHE_TTL; concurrent callers share one in-flight fetch.
+
+        While the background refresher runs, its latest list is returned as is.
+        """
+        cache = self._mp_cache
+        if cache and (self._mp_refresher is not None or time.monotonic() - cache[0] < self.MOUNTPOINT_CACHE_TTL):
+            return cache
+        if self._mp_inflight is None:
+            self._mp_inflight = asyncio.ensure_future(self._load_mountpoints(self._mp_version))
+            self._mp_inflight.add_done_callback(self._clear_mountpoint_inflight)
+        # Shielded so one cancelled caller doesn't cancel the fetch the others are waiting on
+        return await asyncio.shield(self._mp_inflight)
+
+    async def _load_mountpoints(self, version: int) -> Tuple[float, Sequence[Mapping[str, Any]], Mapping[int, Mapping[str, Any]]]:
+        """Fetch and cache mountpoints, unless the cache was invalidated after `version` was read."""
+        mountpoints = await self._fetch_mountpoints()
+        if version != self._mp_version:
+            # Invalidated mid-fetch: answer these callers, but don't cache a pre-invalidation list
+            return (time.monotonic(), mountpoints, _index_mountpoints(mountpoints))
+        return self._store_mountpoints(mountpoints)
+
+    def _clear_mountpoint_inflight(self, fetch: asyncio.Future) -> None:
+        if self._mp_inflight is fetch:
+            self._mp_inflight = None
+        if not fetch.cancelled():
+            fetch.exception()  # Waiters re-raise it; don't also log it as unretrieved
+
+    def invalidate_mountpoint_cache(self) -> None:
+        """Drop cached mountpoints so the next lookup asks Janus again."""
+        self._mp_version += 1
+        self._mp_cache = None
+        # Later callers must not join a fetch that started before the change
+        self._mp_inflight = None
+
+    async def list_mountpoints(self) -> Sequence[Mapping[str, Any]]:
         """List all mountpoints from Janus streaming plugin - only active streams."""
+        return (await self._cached_mountpoints())[1]
+
+    async def snapshot(self) -> Tuple[Sequence[Mapping[str, Any]], bool]:
+        """Mountpoints plus Janus health from a single lookup.
+
+        Healthy means at least one mountpoint is streaming and the list is current:
+        a stale list the refresher could not update from Janus is never reported healthy.
+        """
+        mountpoints = await self.list_mountpoints()
+        return mountpoints, self.last_refresh_ok and any(mp.get("streaming", False) for mp in mountpoints)
+
+    async def list_mountpoint_infos(self, mountpoint_ids: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Live Janus `info` for several mountpoints, asked for in one batch; None where Janus has no answer."""
+        replies = await self._core_api_flow_batch([{"request": "info", "id": mp_id} for mp_id in mountpoint_ids])
+        return [reply.get("info") if reply else None for reply in replies]
+
+    async def _fetch_mountpoints(self) -> Sequence[Mapping[str, Any]]:
         # Return only the active streams that are actually loaded in Janus
-        # This matches the janus.plugin.streaming.jcfg configuration
-        return [
-            {
-                "id": 1,
-                "type": "rtsp",
-                "description": "Live Camera 1 - Office",
-                "enabled": True,
-                "streaming": True,
-                "metadata": "VAS Live Camera 1 - Direct RTSP"
-            },
-            {
-                "id": 2,
-                "type": "rtsp", 
-                "description": "Live Camera 2 - Lobby",
-                "enabled": True,
-                "streaming": True,
-                "metadata": "VAS Live Camera 2 - Direct RTSP"
-            }
-        ]
+        return STATIC_MOUNTPOINTS
 
     def get_webrtc_url(self) -> str:
         """Returns the public-facing WebRTC URL for client connections."""
         return self.core_ws_url
 
     def get_proxy_mountpoint_for_device_sync(self, device_id: str) -> Optional[int]:
-        return DEVICE_TO_MOUNTPOINT_MAP.get(device_id)
+        return _DEVICE_MAP_GET(device_id)
 
-    async def get_mountpoint_info(self, mountpoint_id: int) -> Optional[Dict[str, Any]]:
-        mountpoints = await self.list_mountpoints()
-        for mountpoint in mountpoints:
-            if mountpoint.get("id") == mountpoint_id:
-                return mountpoint
-        return None
+    def get_proxy_mountpoint_map_sync(self) -> Dict[str, int]:
+        """All device id -> proxy mountpoint id mappings, for bulk lookups.
+
+        The mapping is an in-memory constant, so lookups never block the
+        event loop; if it ever moves to config or Janus, cache it here.
+        """
+        return DEVICE_TO_MOUNTPOINT_MAP
+
+    async def get_mountpoint_map(self) -> Mapping[int, Mapping[str, Any]]:
+        """Mountpoints keyed by id, built once per cache refresh; treat as read-only."""
+        return (await self._cached_mountpoints())[2]
+
+    async def get_mountpoint_info(self, mountpoint_id: int) -> Optional[Mapping[str, Any]]:
+        return (await self._cached_mountpoints())[2].get(mountpoint_id)
 
     async def health_check(self) -> bool:
-        """Check if Janus is healthy by verifying mountpoints are available."""
-        print("DEBUG: Health check method called")
+        """Check if Janus is healthy by verifying mountpoints are available.
+
+        When the shared Core API connection is up, Janus must also answer `info` on it.
+        """
         try:
+            if self._ws is not None and not self._ws.closed and await self.server_info() is None:
+                logger.warning("Janus health check: no server_info reply on the Core API connection")
+                return False
             # Check if we can get mountpoints (indicates Janus is working)
             mountpoints = await self.list_mountpoints()
-            print(f"DEBUG: Found {len(mountpoints)} mountpoints")
-            logger.info(f"Health check: Found {len(mountpoints)} mountpoints")
+            logger.info("Health check: Found %d mountpoints", len(mountpoints))
             
             if mountpoints and len(mountpoints) > 0:
                 # Check if at least one stream is active
                 active_streams = [mp for mp in mountpoints if mp.get("streaming", False)]
-                logger.info(f"Health check: {len(active_streams)} active streams out of {len(mountpoints)} total")
+                logger.info("Health check: %d active streams out of %d total", len(active_streams), len(mountpoints))
                 
-                # Debug: log first mountpoint details
-                if mountpoints:
-                    first_mp = mountpoints[0]
-                    logger.info(f"Health check: First mountpoint streaming={first_mp.get('streaming')} (type: {type(first_mp.get('streaming'))})")
+                if logger.isEnabledFor(logging.DEBUG):
+                    streaming = mountpoints[0].get("streaming")
+                    logger.debug("Health check: First mountpoint streaming=%s (type: %s)", streaming, type(streaming))
                 
                 is_healthy = len(active_streams) > 0
                 if not is_healthy:
-                    logger.warning(f"Janus health check: No active streams found. Total mountpoints: {len(mountpoints)}")
+                    logger.warning("Janus health check: No active streams found. Total mountpoints: %d", len(mountpoints))
                 else:
-                    logger.info(f"Janus health check: Healthy - {len(active_streams)} active streams")
+                    logger.info("Janus health check: Healthy - %d active streams", len(active_streams))
                 return is_healthy
             else:
                 logger.warning("Janus health check: No mountpoints found")
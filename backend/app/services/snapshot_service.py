@@ -8,13 +8,11 @@ import base64
 import logging
 import subprocess
 import tempfile
-from datetime import datetime
 from typing import Optional, Tuple
 from pathlib import Path
-import uuid
 
 from sqlalchemy.orm import Session
-from app.models import Device, Snapshot, DeviceStatus
+from app.models import Device, Snapshot, DeviceStatus, utc_now, uuid7
 from app.core.constants import DEVICE_TO_MOUNTPOINT_MAP
 
 logger = logging.getLogger(__name__)
@@ -64,6 +62,11 @@ class SnapshotService:
                 logger.error(f"Device {device.id} has no RTSP URL")
                 return None
             
+            # Don't hold a pooled connection for the seconds FFmpeg takes: the device row is
+            # fully loaded, so detach it and end the read transaction before capturing
+            db.expunge(device)
+            db.commit()
+
             # Capture image using FFmpeg
             image_data, width, height = await self._capture_image_from_rtsp(device)
             
@@ -73,14 +76,14 @@ class SnapshotService:
             
             # Create snapshot record
             snapshot = Snapshot(
-                id=uuid.uuid4(),
+                id=uuid7(),
                 device_id=device.id,
                 image_data=image_data,
                 image_format='jpeg',
                 width=width,
                 height=height,
                 file_size=len(image_data),
-                captured_at=datetime.utcnow()
+                captured_at=utc_now()
             )
             
             # Save to database
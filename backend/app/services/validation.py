@@ -7,6 +7,26 @@ from app.config import settings
 
 
 class RTSPValidationService:
+    # Common RTSP URL patterns, formatted with the device IP
+    _URL_TEMPLATES = (
+        "rtsp://{ip}:554/stream1",
+        "rtsp://{ip}:554/live",
+        "rtsp://{ip}/live1s1.sdp",  # Added for IP cameras like the ones in this deployment
+        "rtsp://{ip}:554/live1s1.sdp",
+        "rtsp://{ip}:554/cam/realmonitor",
+        "rtsp://{ip}:554/axis-media/media.amp",
+        "rtsp://{ip}:554/onvif1",
+        "rtsp://{ip}:554/h264Preview_01_main",
+        "rtsp://{ip}:554/live/ch0",
+        "rtsp://{ip}:554/streaming/channels/101",
+        "rtsp://{ip}:554/11",
+        "rtsp://{ip}:554/1",
+        # Alternative ports
+        "rtsp://{ip}:8554/stream1",
+        "rtsp://{ip}:8554/live",
+        "rtsp://{ip}:8554/cam/realmonitor",
+    )
+    
     def __init__(self):
         self.timeout = settings.ffprobe_timeout
         self.retries = settings.validation_retries
@@ -70,24 +90,7 @@ class RTSPValidationService:
     
     def _generate_common_rtsp_urls(self, ip_address: str) -> list:
         """Generate common RTSP URL patterns for testing."""
-        return [
-            f"rtsp://{ip_address}:554/stream1",
-            f"rtsp://{ip_address}:554/live",
-            f"rtsp://{ip_address}/live1s1.sdp",  # Added for IP cameras like the ones in this deployment
-            f"rtsp://{ip_address}:554/live1s1.sdp",
-            f"rtsp://{ip_address}:554/cam/realmonitor",
-            f"rtsp://{ip_address}:554/axis-media/media.amp",
-            f"rtsp://{ip_address}:554/onvif1",
-            f"rtsp://{ip_address}:554/h264Preview_01_main",
-            f"rtsp://{ip_address}:554/live/ch0",
-            f"rtsp://{ip_address}:554/streaming/channels/101",
-            f"rtsp://{ip_address}:554/11",
-            f"rtsp://{ip_address}:554/1",
-            # Alternative ports
-            f"rtsp://{ip_address}:8554/stream1",
-            f"rtsp://{ip_address}:8554/live",
-            f"rtsp://{ip_address}:8554/cam/realmonitor",
-        ]
+        return [template.format(ip=ip_address) for template in self._URL_TEMPLATES]
     
     def _add_authentication(self, url: str, username: str, password: str) -> str:
         """Add authentication credentials to RTSP URL."""
@@ -104,7 +107,7 @@ class RTSPValidationService:
                 "ffprobe",
                 "-v", "quiet",
                 "-print_format", "json",
-                "-show_format",
+                "-select_streams", "v:0",  # Only the first video stream is used
                 "-show_streams",
                 "-timeout", str(self.timeout * 1000000),  # Convert to microseconds
                 url
@@ -203,12 +206,13 @@ class RTSPValidationService:
         """Validate device health by checking RTSP stream status."""
         ip_address = device_info.get("ip_address")
         rtsp_url = device_info.get("rtsp_url")
+        port = device_info.get("port") or 554
         
         if not ip_address:
             return {"status": "UNREACHABLE", "error": "No IP address provided"}
         
         # First check if device is reachable
-        if not await self._is_device_reachable(ip_address):
+        if not await self._is_device_reachable(ip_address, port):
             return {"status": "UNREACHABLE", "error": "Device not reachable"}
         
         # If we have an RTSP URL, validate it
@@ -226,16 +230,16 @@ class RTSPValidationService:
         else:
             return {"status": "OFFLINE", "error": "No valid RTSP stream found"}
     
-    async def _is_device_reachable(self, ip_address: str) -> bool:
-        """Check if device is reachable using ping."""
+    async def _is_device_reachable(self, ip_address: str, port: int = 554) -> bool:
+        """Check if device is reachable by opening a TCP connection to its RTSP port."""
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "ping", "-c", "1", "-W", "3", ip_address,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, port),
+                timeout=2
             )
-            await asyncio.wait_for(proc.wait(), timeout=5)
-            return proc.returncode == 0
+            writer.close()
+            await writer.wait_closed()
+            return True
         except (asyncio.TimeoutError, Exception):
             return False
 
@@ -9,7 +9,7 @@ import sys
 import json
 from datetime import datetime
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, load_only
 
 # Add the app directory to the path
 sys.path.append('/app')
@@ -18,6 +18,9 @@ from app.config import settings
 from app.models import Device, DeviceStatus
 from app.services.validation import RTSPValidationService
 
+# Validation service status strings -> DeviceStatus members
+_STATUS_MAP = {member.value: member for member in DeviceStatus}
+
 async def check_all_devices():
     """Check status of all devices and update the database."""
     validation_service = RTSPValidationService()
@@ -27,8 +30,10 @@ async def check_all_devices():
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     with SessionLocal() as db:
-        # Get all devices
-        devices = db.query(Device).all()
+        # Get all devices, loading only the columns the check needs
+        devices = db.query(Device).options(
+            load_only(Device.id, Device.name, Device.ip_address, Device.rtsp_url, Device.status)
+        ).all()
         
         if not devices:
             print("No devices found in database.")
@@ -48,7 +53,7 @@ async def check_all_devices():
                 
                 # Check device health
                 health_result = await validation_service.validate_device_health(device_info)
-                new_status = DeviceStatus(health_result.get("status", "UNREACHABLE"))
+                new_status = _STATUS_MAP.get(health_result.get("status"), DeviceStatus.UNREACHABLE)
                 error = health_result.get("error")
                 
                 # Update device status if changed
@@ -36,8 +36,8 @@ def add_missing_columns():
             ("password", "TEXT"),
             ("location", "VARCHAR(255)"),
             ("description", "TEXT"),
-            ("tags", "TEXT"),
-            ("device_metadata", "TEXT")
+            ("tags", "JSONB"),
+            ("device_metadata", "JSONB")
         ]
         
         for column_name, column_type in columns_to_add:
@@ -0,0 +1,23 @@
+"""Add device status index
+
+Revision ID: 004_add_device_status_index
+Revises: 003_add_snapshots_table
+Create Date: 2025-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_add_device_status_index'
+down_revision = '003_add_snapshots_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite index covers status-only filters as well as status + last_seen range scans
+    op.create_index('ix_devices_status_last_seen', 'devices', ['status', 'last_seen'])
+
+
+def downgrade():
+    op.drop_index('ix_devices_status_last_seen', table_name='devices')
@@ -0,0 +1,25 @@
+"""Convert device tags and metadata to JSONB
+
+Revision ID: 005_convert_device_json_columns
+Revises: 004_add_device_status_index
+Create Date: 2025-10-16 12:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005_convert_device_json_columns'
+down_revision = '004_add_device_status_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing values were stored as JSON strings, so they cast directly
+    op.execute("ALTER TABLE devices ALTER COLUMN tags TYPE jsonb USING tags::jsonb")
+    op.execute("ALTER TABLE devices ALTER COLUMN device_metadata TYPE jsonb USING device_metadata::jsonb")
+
+
+def downgrade():
+    op.execute("ALTER TABLE devices ALTER COLUMN device_metadata TYPE text USING device_metadata::text")
+    op.execute("ALTER TABLE devices ALTER COLUMN tags TYPE text USING tags::text")
@@ -0,0 +1,26 @@
+"""Add snapshot (device_id, captured_at DESC) index
+
+Revision ID: 006_add_snapshot_device_captured_index
+Revises: 005_convert_device_json_columns
+Create Date: 2025-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_add_snapshot_device_captured_index'
+down_revision = '005_convert_device_json_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # "Latest snapshots for a device" reads this in order; it also covers device_id-only filters
+    op.create_index('idx_snapshots_device_captured', 'snapshots', ['device_id', sa.text('captured_at DESC')])
+    op.drop_index('idx_snapshots_device_id', table_name='snapshots')
+
+
+def downgrade():
+    op.create_index('idx_snapshots_device_id', 'snapshots', ['device_id'])
+    op.drop_index('idx_snapshots_device_captured', table_name='snapshots')
@@ -0,0 +1,26 @@
+"""Store snapshot images out of line without TOAST compression
+
+Revision ID: 007_store_snapshot_images_uncompressed
+Revises: 006_add_snapshot_device_captured_index
+Create Date: 2025-10-16 13:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_store_snapshot_images_uncompressed'
+down_revision = '006_add_snapshot_device_captured_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # JPEG/PNG data is already compressed; pglz only burns CPU on it. Applies to rows written from now on.
+    op.execute("ALTER TABLE snapshots ALTER COLUMN image_data SET STORAGE EXTERNAL")
+    # Move image data out of the heap row early so metadata-only reads stay on small tuples
+    op.execute("ALTER TABLE snapshots SET (toast_tuple_target = 512)")
+
+
+def downgrade():
+    op.execute("ALTER TABLE snapshots RESET (toast_tuple_target)")
+    op.execute("ALTER TABLE snapshots ALTER COLUMN image_data SET STORAGE EXTENDED")
@@ -0,0 +1,47 @@
+"""Make snapshot timestamps TIMESTAMPTZ NOT NULL
+
+Revision ID: 008_snapshot_timestamps_timestamptz
+Revises: 007_store_snapshot_images_uncompressed
+Create Date: 2025-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_snapshot_timestamps_timestamptz'
+down_revision = '007_store_snapshot_images_uncompressed'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('captured_at', 'created_at', 'updated_at')
+
+
+def upgrade():
+    # Existing values were written with datetime.utcnow(), so they are UTC wall-clock times
+    op.execute(
+        "UPDATE snapshots SET "
+        "captured_at = COALESCE(captured_at, created_at, now() AT TIME ZONE 'UTC'), "
+        "created_at = COALESCE(created_at, captured_at, now() AT TIME ZONE 'UTC'), "
+        "updated_at = COALESCE(updated_at, created_at, captured_at, now() AT TIME ZONE 'UTC') "
+        "WHERE captured_at IS NULL OR created_at IS NULL OR updated_at IS NULL"
+    )
+    for column in COLUMNS:
+        op.alter_column(
+            'snapshots', column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            nullable=False,
+            server_default=sa.func.now()
+        )
+
+
+def downgrade():
+    for column in COLUMNS:
+        op.alter_column(
+            'snapshots', column,
+            type_=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            nullable=True,
+            server_default=None
+        )
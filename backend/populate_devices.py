@@ -8,11 +8,11 @@ after the application starts, ensuring devices are always available.
 import asyncio
 import sys
 import os
+import random
 import time
-import json
 from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import OperationalError
 import logging
 
@@ -21,7 +21,7 @@ sys.path.append('/app')
 
 from app.config import settings
 from app.models import Device, DeviceStatus
-from app.database import Base, get_db
+from app.database import Base, SessionLocal, engine
 from app.services.validation import RTSPValidationService
 from app.core.constants import STANDARD_DEVICES
 
@@ -31,63 +31,89 @@ logger = logging.getLogger(__name__)
 
 # Standard devices are now imported from constants.py
 
-def wait_for_database(max_retries=30, delay=2):
-    """Wait for the database to be ready."""
-    engine = create_engine(settings.database_url)
-    
-    for attempt in range(max_retries):
-        try:
-            with engine.connect() as connection:
-                connection.execute(text("SELECT 1"))
-            logger.info("Database is ready!")
-            return True
-        except OperationalError as e:
-            logger.info(f"Database not ready (attempt {attempt + 1}/{max_retries}): {e}")
-            time.sleep(delay)
-    
-    logger.error("Database failed to become ready after maximum retries")
-    return False
+# Insert-ready rows built once from STANDARD_DEVICES; only status and last_seen vary per run
+_DEVICE_COLUMNS = (
+    "id", "name", "device_type", "manufacturer", "model", "ip_address", "port",
+    "rtsp_url", "username", "password", "location", "description", "tags",
+    "device_metadata", "hostname", "vendor", "resolution", "codec", "fps",
+)
+_PREPARED_ROWS = [
+    {
+        **{column: device_data[column] for column in _DEVICE_COLUMNS},
+        "credentials_secure": False,
+        "encrypted_credentials": None,
+    }
+    for device_data in STANDARD_DEVICES
+]
 
-def wait_for_tables(max_retries=30, delay=2):
-    """Wait for the application to create the necessary tables."""
-    engine = create_engine(settings.database_url)
-    
-    for attempt in range(max_retries):
+# Upper bound on device health checks running at the same time
+MAX_CONCURRENT_STATUS_CHECKS = 20
+
+# Validation service status strings -> DeviceStatus members
+_STATUS_MAP = {member.value: member for member in DeviceStatus}
+
+# Recent successful probes, keyed by (ip_address, rtsp_url) -> (status, checked_at)
+STATUS_CACHE_TTL = 60
+_STATUS_CACHE = {}
+
+def _backoff_delay(attempt):
+    """Exponential backoff with jitter between readiness probes."""
+    return min(30, 0.25 * (2 ** attempt)) + random.uniform(0, 0.25)
+
+def wait_for_schema(timeout=120):
+    """Wait for the database to be up and for the application to create the devices table."""
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
         try:
             with engine.connect() as connection:
-                # Check if the devices table exists
-                result = connection.execute(text("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_schema = 'public' 
-                        AND table_name = 'devices'
-                    );
-                """))
-                if result.scalar():
-                    logger.info("Tables are ready!")
-                    return True
-                else:
-                    logger.info(f"Tables not ready (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(delay)
-        except Exception as e:
-            logger.info(f"Error checking tables (attempt {attempt + 1}/{max_retries}): {e}")
-            time.sleep(delay)
+                # One round trip proves both liveness and table presence
+                tables_ready = connection.execute(
+                    text("SELECT to_regclass('public.devices') IS NOT NULL")
+                ).scalar()
+            if tables_ready:
+                logger.info("Database and tables are ready!")
+                return True
+            logger.info(f"Tables not ready (attempt {attempt + 1})")
+        except OperationalError as e:
+            logger.info(f"Database not ready (attempt {attempt + 1}): {e}")
+            # Drop pooled connections that may have been opened against a database that went away
+            engine.dispose()
+        
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(min(_backoff_delay(attempt), max(0, deadline - time.monotonic())))
+        attempt += 1
     
-    logger.error("Tables failed to become ready after maximum retries")
+    logger.error(f"Database schema failed to become ready within {timeout}s")
     return False
 
-async def check_device_status(device_data):
+async def check_device_status(validation_service, device_data):
     """Check the actual status of a device using the validation service."""
-    validation_service = RTSPValidationService()
-    
     device_info = {
         "ip_address": device_data["ip_address"],
         "rtsp_url": device_data["rtsp_url"]
     }
     
+    cache_key = (device_data["ip_address"], device_data["rtsp_url"])
+    cached = _STATUS_CACHE.get(cache_key)
+    if cached and time.monotonic() - cached[1] < STATUS_CACHE_TTL:
+        logger.info(f"Device {device_data['name']}: {cached[0]} (cached)")
+        return cached[0]
+    
     try:
         logger.info(f"Checking status for device {device_data['name']} ({device_data['ip_address']})...")
-        health_result = await validation_service.validate_device_health(device_info)
+        try:
+            health_result = await asyncio.wait_for(
+                validation_service.validate_device_health(device_info),
+                timeout=settings.device_health_check_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Status check for device {device_data['name']} timed out after "
+                f"{settings.device_health_check_timeout}s"
+            )
+            return DeviceStatus.UNREACHABLE
         status = health_result.get("status", "UNREACHABLE")
         error = health_result.get("error")
         
@@ -96,69 +122,61 @@ async def check_device_status(device_data):
         else:
             logger.info(f"Device {device_data['name']}: {status}")
         
-        return DeviceStatus(status)
+        device_status = _STATUS_MAP.get(status, DeviceStatus.UNREACHABLE)
+        # Only cache successes so that failing devices are re-probed next time
+        if device_status == DeviceStatus.ONLINE:
+            _STATUS_CACHE[cache_key] = (device_status, time.monotonic())
+        return device_status
     except Exception as e:
         logger.error(f"Error checking status for device {device_data['name']}: {e}")
         return DeviceStatus.UNREACHABLE
 
+def _count_devices():
+    """Return the number of devices already stored."""
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(Device)).scalar()
+
+def _insert_devices(rows):
+    """Insert all device rows with a single statement, skipping ones that already exist."""
+    with SessionLocal() as db:
+        if rows:
+            db.execute(pg_insert(Device).values(rows).on_conflict_do_nothing())
+        db.commit()
+
 async def populate_devices():
     """Populate the database with standard devices and check their actual status."""
     try:
-        engine = create_engine(settings.database_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Database work runs in worker threads so the event loop stays free for the probes
+        existing_count = await asyncio.to_thread(_count_devices)
+        if existing_count > 0:
+            logger.info(f"Database already contains {existing_count} devices. Skipping population.")
+            return
+        
+        logger.info("Populating database with standard devices...")
+        
+        # Check the actual device statuses concurrently; only the inserts stay serial
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_STATUS_CHECKS)
+        validation_service = RTSPValidationService()
+        
+        async def _checked(device_data):
+            async with semaphore:
+                try:
+                    return await check_device_status(validation_service, device_data)
+                except Exception:
+                    return DeviceStatus.UNREACHABLE
+        
+        statuses = await asyncio.gather(*(_checked(row) for row in _PREPARED_ROWS))
+        
+        # Splice the measured status into the prepared rows and insert them in one statement
+        now = datetime.utcnow()
+        rows = []
+        for row, device_status in zip(_PREPARED_ROWS, statuses):
+            rows.append({**row, "status": device_status, "last_seen": now})
+            logger.info(f"Adding device: {row['name']} ({row['ip_address']}) - Status: {device_status}")
+        
+        await asyncio.to_thread(_insert_devices, rows)
+        logger.info("Successfully populated database with standard devices!")
         
-        with SessionLocal() as db:
-            # Check if devices already exist
-            existing_count = db.query(Device).count()
-            if existing_count > 0:
-                logger.info(f"Database already contains {existing_count} devices. Skipping population.")
-                return
-            
-            logger.info("Populating database with standard devices...")
-            
-            for device_data in STANDARD_DEVICES:
-                # Check if device with this IP already exists
-                existing = db.query(Device).filter(Device.ip_address == device_data["ip_address"]).first()
-                if existing:
-                    logger.info(f"Device {device_data['name']} already exists. Skipping.")
-                    continue
-                
-                # Check the actual device status
-                device_status = await check_device_status(device_data)
-                
-                # Create new device with properly serialized JSON fields and actual status
-                device = Device(
-                    id=device_data["id"],
-                    name=device_data["name"],
-                    device_type=device_data["device_type"],
-                    manufacturer=device_data["manufacturer"],
-                    model=device_data["model"],
-                    ip_address=device_data["ip_address"],
-                    port=device_data["port"],
-                    rtsp_url=device_data["rtsp_url"],
-                    username=device_data["username"],
-                    password=device_data["password"],
-                    location=device_data["location"],
-                    description=device_data["description"],
-                    tags=json.dumps(device_data["tags"]),  # Serialize as JSON string
-                    device_metadata=json.dumps(device_data["device_metadata"]),  # Serialize as JSON string
-                    hostname=device_data["hostname"],
-                    vendor=device_data["vendor"],
-                    resolution=device_data["resolution"],
-                    codec=device_data["codec"],
-                    fps=device_data["fps"],
-                    status=device_status,  # Use actual checked status
-                    last_seen=datetime.utcnow(),
-                    credentials_secure=False,
-                    encrypted_credentials=None
-                )
-                
-                db.add(device)
-                logger.info(f"Added device: {device_data['name']} ({device_data['ip_address']}) - Status: {device_status}")
-            
-            db.commit()
-            logger.info("Successfully populated database with standard devices!")
-            
     except Exception as e:
         logger.error(f"Error populating devices: {e}")
         raise
@@ -167,14 +185,9 @@ def main():
     """Main function to populate devices."""
     logger.info("Starting device population script...")
     
-    # Wait for database to be ready
-    if not wait_for_database():
-        logger.error("Database is not ready. Exiting.")
-        sys.exit(1)
-    
-    # Wait for tables to be created
-    if not wait_for_tables():
-        logger.error("Tables are not ready. Exiting.")
+    # Wait for the database to be ready and the tables to be created
+    if not wait_for_schema():
+        logger.error("Database schema is not ready. Exiting.")
         sys.exit(1)
     
     # Populate devices (async function)
@@ -8,11 +8,17 @@ import requests
 import json
 import time
 import sys
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 
 # Configuration
 BASE_URL = "http://localhost:8000"
 API_BASE = f"{BASE_URL}/api"
+REQUEST_TIMEOUT = 5
+
+# One keep-alive session shared by every request in the suite
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
 
 # Colors for output
 class Colors:
@@ -33,16 +39,15 @@ def test_endpoint(method: str, endpoint: str, data: Dict[str, Any] | None = None
     url = f"{API_BASE}{endpoint}"
     
     try:
-        if method.upper() == "GET":
-            response = requests.get(url, headers=headers)
-        elif method.upper() == "POST":
-            response = requests.post(url, json=data, headers=headers)
-        elif method.upper() == "PATCH":
-            response = requests.patch(url, json=data, headers=headers)
-        elif method.upper() == "DELETE":
-            response = requests.delete(url, headers=headers)
-        else:
+        if method.upper() not in ("GET", "POST", "PATCH", "DELETE"):
             raise ValueError(f"Unsupported method: {method}")
+        response = SESSION.request(
+            method.upper(),
+            url,
+            json=data if method.upper() in ("POST", "PATCH") else None,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT
+        )
         
         success = response.status_code == expected_status
         print_status(f"{method} {endpoint} - Status: {response.status_code}", "PASS" if success else "FAIL")
@@ -60,28 +65,49 @@ def test_endpoint(method: str, endpoint: str, data: Dict[str, Any] | None = None
         print_status(f"{method} {endpoint} - Error: {str(e)}", "FAIL")
         return {}
 
+def run_parallel(cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run independent endpoint tests concurrently; results keep the order of cases."""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(executor.map(lambda case: test_endpoint(**case), cases))
+
+def check_docs_page(path: str, name: str):
+    """Check that a documentation page is served."""
+    try:
+        response = SESSION.get(f"{BASE_URL}{path}", timeout=REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            print_status(f"{name} is accessible", "PASS")
+        else:
+            print_status(f"{name} returned status: {response.status_code}", "FAIL")
+    except Exception as e:
+        print_status(f"{name} error: {str(e)}", "FAIL")
+
 def main():
     """Run comprehensive API tests."""
     print(f"{Colors.BOLD}🚀 VAS Phase 1 API Test Suite{Colors.ENDC}")
     print(f"{Colors.BLUE}Testing API at: {BASE_URL}{Colors.ENDC}")
     print("=" * 60)
     
-    # Test 1: Health Check (No Auth Required)
-    print(f"\n{Colors.BOLD}1. Health Check{Colors.ENDC}")
-    health_response = test_endpoint("GET", "/health")
-    
-    # Test 2: Root Endpoint (No Auth Required)
-    print(f"\n{Colors.BOLD}2. Root Endpoint{Colors.ENDC}")
-    root_response = test_endpoint("GET", "/")
+    # Test 1 & 2: Health Check and Root Endpoint (No Auth Required)
+    print(f"\n{Colors.BOLD}1-2. Health Check and Root Endpoint{Colors.ENDC}")
+    health_response, root_response = run_parallel([
+        {"method": "GET", "endpoint": "/health"},
+        {"method": "GET", "endpoint": "/"},
+    ])
     
     # Test 3: Authentication
     print(f"\n{Colors.BOLD}3. Authentication{Colors.ENDC}")
     
-    # Test login with invalid credentials
-    print_status("Testing login with invalid credentials", "INFO")
-    test_endpoint("POST", "/auth/login-json", 
-                 {"username": "wrong", "password": "wrong"}, 
-                 expected_status=401)
+    # Negative-auth checks are independent of each other, so run them together
+    print_status("Testing invalid login and endpoints without authentication", "INFO")
+    run_parallel([
+        {"method": "POST", "endpoint": "/auth/login-json",
+         "data": {"username": "wrong", "password": "wrong"}, "expected_status": 401},
+        {"method": "POST", "endpoint": "/discover",
+         "data": {"subnets": ["192.168.1.0/24"]}, "expected_status": 401},
+        {"method": "GET", "endpoint": "/devices", "expected_status": 401},
+        {"method": "POST", "endpoint": "/devices/validate",
+         "data": {"ip_address": "192.168.1.100"}, "expected_status": 401},
+    ])
     
     # Test login with valid credentials
     print_status("Testing login with valid credentials", "INFO")
@@ -104,12 +130,6 @@ def main():
     # Test 4: Device Discovery
     print(f"\n{Colors.BOLD}4. Device Discovery{Colors.ENDC}")
     
-    # Test discovery without auth
-    print_status("Testing discovery without authentication", "INFO")
-    test_endpoint("POST", "/discover", 
-                 {"subnets": ["192.168.1.0/24"]}, 
-                 expected_status=401)
-    
     # Test discovery with auth
     print_status("Testing discovery with authentication", "INFO")
     discovery_response = test_endpoint("POST", "/discover", 
@@ -132,10 +152,6 @@ def main():
     # Test 5: Device Management
     print(f"\n{Colors.BOLD}5. Device Management{Colors.ENDC}")
     
-    # Test getting devices without auth
-    print_status("Testing device list without authentication", "INFO")
-    test_endpoint("GET", "/devices", expected_status=401)
-    
     # Test getting devices with auth
     print_status("Testing device list with authentication", "INFO")
     devices_response = test_endpoint("GET", "/devices", headers=auth_headers)
@@ -167,12 +183,6 @@ def main():
     # Test 6: RTSP Validation
     print(f"\n{Colors.BOLD}6. RTSP Validation{Colors.ENDC}")
     
-    # Test validation without auth
-    print_status("Testing validation without authentication", "INFO")
-    test_endpoint("POST", "/devices/validate", 
-                 {"ip_address": "192.168.1.100"}, 
-                 expected_status=401)
-    
     # Test validation with auth
     print_status("Testing validation with authentication", "INFO")
     validation_response = test_endpoint("POST", "/devices/validate", 
@@ -201,23 +211,9 @@ def main():
     # Test 8: API Documentation
     print(f"\n{Colors.BOLD}8. API Documentation{Colors.ENDC}")
     
-    try:
-        response = requests.get(f"{BASE_URL}/docs")
-        if response.status_code == 200:
-            print_status("Swagger UI is accessible", "PASS")
-        else:
-            print_status(f"Swagger UI returned status: {response.status_code}", "FAIL")
-    except Exception as e:
-        print_status(f"Swagger UI error: {str(e)}", "FAIL")
-    
-    try:
-        response = requests.get(f"{BASE_URL}/redoc")
-        if response.status_code == 200:
-            print_status("ReDoc is accessible", "PASS")
-        else:
-            print_status(f"ReDoc returned status: {response.status_code}", "FAIL")
-    except Exception as e:
-        print_status(f"ReDoc error: {str(e)}", "FAIL")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda page: check_docs_page(*page),
+                          [("/docs", "Swagger UI"), ("/redoc", "ReDoc")]))
     
     # Summary
     print(f"\n{Colors.BOLD}{'=' * 60}")
@@ -25,6 +25,23 @@ def test_health_endpoint():
     assert "version" in data
 
 
+def test_health_reports_cached_ffprobe_probe():
+    """Test health check reads the background ffprobe result instead of spawning it."""
+    with patch.object(app.state, "ffprobe_available", True, create=True), \
+         patch("asyncio.create_subprocess_exec") as spawn:
+        response = client.get("/api/health")
+    assert response.json()["ffprobe"] == "available"
+    spawn.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_probe_ffprobe_missing_binary():
+    """Test ffprobe probe reports unavailable when the binary cannot be started."""
+    from app.main import probe_ffprobe
+    with patch("asyncio.create_subprocess_exec", AsyncMock(side_effect=FileNotFoundError)):
+        assert await probe_ffprobe() is False
+
+
 def test_login_endpoint():
     """Test login endpoint."""
     response = client.post("/api/auth/login-json", json={
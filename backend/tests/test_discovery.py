@@ -1,14 +1,35 @@
 import pytest
 import asyncio
-from unittest.mock import patch, AsyncMock
+from contextlib import contextmanager
+from unittest.mock import patch, AsyncMock, MagicMock
 from app.services.discovery import NetworkDiscoveryService
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def discovery_service():
     return NetworkDiscoveryService()
 
 
+@contextmanager
+def mocked_scan(service, **overrides):
+    """Patch the per-IP probe helpers with reachable-device defaults."""
+    defaults = {
+        "_is_ip_reachable": True,
+        "_check_rtsp_ports": [554],
+        "_get_hostname": "test-device",
+        "_identify_vendor": {"vendor": "Test", "rtsp_url": "rtsp://192.168.1.1:554/stream1"},
+    }
+    defaults.update(overrides)
+    patches = [patch.object(service, name, return_value=value) for name, value in defaults.items()]
+    for p in patches:
+        p.start()
+    try:
+        yield
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
 @pytest.mark.asyncio
 async def test_scan_subnets_empty_list(discovery_service):
     """Test scanning empty subnet list."""
@@ -28,11 +49,7 @@ async def test_scan_subnets_invalid_subnet(discovery_service):
 @pytest.mark.asyncio
 async def test_scan_single_ip_reachable(discovery_service):
     """Test scanning a single reachable IP."""
-    with patch.object(discovery_service, '_is_ip_reachable', return_value=True), \
-         patch.object(discovery_service, '_check_rtsp_ports', return_value=[554]), \
-         patch.object(discovery_service, '_get_hostname', return_value="test-device"), \
-         patch.object(discovery_service, '_identify_vendor', return_value={"vendor": "Test", "rtsp_url": "rtsp://192.168.1.1:554/stream1"}):
-        
+    with mocked_scan(discovery_service):
         result = await discovery_service._scan_single_ip("192.168.1.1")
         
         assert result["ip_address"] == "192.168.1.1"
@@ -41,10 +58,43 @@ async def test_scan_single_ip_reachable(discovery_service):
         assert result["rtsp_url"] == "rtsp://192.168.1.1:554/stream1"
 
 
+@pytest.mark.asyncio
+async def test_scan_single_ip_alternate_port(discovery_service):
+    """Test vendor probe is redone on the open port when the default port is closed."""
+    with mocked_scan(discovery_service, _check_rtsp_ports=[8554]), \
+         patch.object(discovery_service, '_identify_vendor', return_value={"vendor": "Test", "rtsp_url": None}) as mock_vendor:
+        
+        result = await discovery_service._scan_single_ip("192.168.1.1")
+        
+        assert result["rtsp_ports"] == [8554]
+        assert mock_vendor.call_args_list[0].args == ("192.168.1.1", 554)
+        assert mock_vendor.call_args_list[-1].args == ("192.168.1.1", 8554)
+
+
+@pytest.mark.asyncio
+async def test_scan_single_ip_reachable_without_rtsp_ports_cancels_vendor_probe(discovery_service):
+    """Test a reachable host with no open RTSP ports doesn't wait on vendor HTTP probes."""
+    vendor_probe_cancelled = asyncio.Event()
+
+    async def slow_vendor_probe(ip, port):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            vendor_probe_cancelled.set()
+            raise
+
+    with mocked_scan(discovery_service, _check_rtsp_ports=[]), \
+         patch.object(discovery_service, '_identify_vendor', side_effect=slow_vendor_probe):
+        result = await asyncio.wait_for(discovery_service._scan_single_ip("192.168.1.1"), 1)
+
+    assert result == {}
+    assert vendor_probe_cancelled.is_set()
+
+
 @pytest.mark.asyncio
 async def test_scan_single_ip_unreachable(discovery_service):
     """Test scanning an unreachable IP."""
-    with patch.object(discovery_service, '_is_ip_reachable', return_value=False):
+    with mocked_scan(discovery_service, _is_ip_reachable=False):
         result = await discovery_service._scan_single_ip("192.168.1.999")
         assert result == {}
 
@@ -52,20 +102,28 @@ async def test_scan_single_ip_unreachable(discovery_service):
 @pytest.mark.asyncio
 async def test_check_rtsp_ports(discovery_service):
     """Test checking RTSP ports."""
-    with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-        # Mock successful port check
-        mock_proc = AsyncMock()
-        mock_proc.returncode = 0
-        mock_subprocess.return_value = mock_proc
+    with patch('asyncio.open_connection') as mock_open_connection:
+        # Mock successful connection
+        mock_writer = AsyncMock()
+        mock_writer.close = lambda: None
+        mock_open_connection.return_value = (AsyncMock(), mock_writer)
         
         result = await discovery_service._check_rtsp_ports("192.168.1.1")
         assert 554 in result
 
 
+@pytest.mark.asyncio
+async def test_check_rtsp_ports_closed(discovery_service):
+    """Test checking RTSP ports when connections are refused."""
+    with patch('asyncio.open_connection', side_effect=ConnectionRefusedError()):
+        result = await discovery_service._check_rtsp_ports("192.168.1.1")
+        assert result == []
+
+
 @pytest.mark.asyncio
 async def test_get_hostname_success(discovery_service):
     """Test successful hostname resolution."""
-    with patch('socket.gethostbyaddr', return_value=("test-device.local", [], ["192.168.1.1"])):
+    with patch('socket.getnameinfo', return_value=("test-device.local", "0")):
         result = await discovery_service._get_hostname("192.168.1.1")
         assert result == "test-device.local"
 
@@ -73,7 +131,7 @@ async def test_get_hostname_success(discovery_service):
 @pytest.mark.asyncio
 async def test_get_hostname_failure(discovery_service):
     """Test failed hostname resolution."""
-    with patch('socket.gethostbyaddr', side_effect=Exception("DNS resolution failed")):
+    with patch('socket.getnameinfo', side_effect=Exception("DNS resolution failed")):
         result = await discovery_service._get_hostname("192.168.1.1")
         assert result == ""
 
@@ -81,11 +139,12 @@ async def test_get_hostname_failure(discovery_service):
 @pytest.mark.asyncio
 async def test_identify_vendor(discovery_service):
     """Test vendor identification."""
-    with patch('aiohttp.ClientSession') as mock_session:
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_session.return_value.__aenter__.return_value.get.return_value.__aenter__.return_value = mock_response
-        
+    mock_session = MagicMock()
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_session.get.return_value.__aenter__.return_value = mock_response
+    
+    with patch.object(discovery_service, '_get_http_session', return_value=mock_session):
         result = await discovery_service._identify_vendor("192.168.1.1", 554)
         assert "vendor" in result
         assert "rtsp_url" in result 
\ No newline at end of file
@@ -0,0 +1,252 @@
+import pytest
+import asyncio
+from contextlib import asynccontextmanager
+from aiohttp import web
+from unittest.mock import patch, AsyncMock
+from app.services.janus_service import JanusService
+
+MOUNTPOINTS = [{"id": 1, "streaming": True}, {"id": 2, "streaming": False}]
+
+
+@pytest.fixture
+def service():
+    return JanusService()
+
+
+@pytest.mark.asyncio
+async def test_list_mountpoints_reuses_cached_list(service):
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(return_value=MOUNTPOINTS)) as fetch:
+        await service.list_mountpoints()
+        await service.list_mountpoints()
+        await service.get_mountpoint_info(1)
+    assert fetch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch(service):
+    async def slow_fetch():
+        await asyncio.sleep(0.01)
+        return MOUNTPOINTS
+
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(side_effect=slow_fetch)) as fetch:
+        results = await asyncio.gather(*(service.list_mountpoints() for _ in range(10)))
+    assert fetch.await_count == 1
+    assert all(r == MOUNTPOINTS for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cache_expires_and_can_be_invalidated(service):
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(return_value=MOUNTPOINTS)) as fetch:
+        await service.list_mountpoints()
+        service.invalidate_mountpoint_cache()
+        await service.list_mountpoints()
+        with patch.object(JanusService, "MOUNTPOINT_CACHE_TTL", 0.0):
+            await service.list_mountpoints()
+    assert fetch.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reports_health_from_the_same_list(service):
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(return_value=MOUNTPOINTS)) as fetch:
+        mountpoints, healthy = await service.snapshot()
+        assert (mountpoints, healthy) == (MOUNTPOINTS, True)
+        service.invalidate_mountpoint_cache()
+        fetch.return_value = [{"id": 2, "streaming": False}]
+        assert (await service.snapshot())[1] is False
+
+
+@pytest.mark.asyncio
+async def test_cached_mountpoints_are_read_only(service):
+    mountpoints = await service.list_mountpoints()
+    with pytest.raises(TypeError):
+        mountpoints[0]["streaming"] = False
+    assert mountpoints is await service.list_mountpoints()
+
+
+@pytest.mark.asyncio
+async def test_refresher_keeps_serving_stale_list_when_janus_fails(service):
+    results = asyncio.Queue()
+    fetched = asyncio.Queue()
+
+    async def fetch():
+        result = await results.get()
+        fetched.put_nowait(None)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(side_effect=fetch)), \
+         patch.object(service, "_get_session", AsyncMock()), \
+         patch.object(JanusService, "MOUNTPOINT_REFRESH_INTERVAL", 0):
+        await service.open()
+        results.put_nowait(MOUNTPOINTS)
+        await fetched.get()
+        await asyncio.sleep(0)
+        assert await service.list_mountpoints() == MOUNTPOINTS
+
+        results.put_nowait(RuntimeError("janus down"))
+        await fetched.get()
+        await asyncio.sleep(0)
+        assert service.last_refresh_ok is False
+        assert await service.list_mountpoints() == MOUNTPOINTS
+        assert (await service.snapshot())[1] is False
+
+        results.put_nowait([MOUNTPOINTS[0]])
+        await fetched.get()
+        await asyncio.sleep(0)
+        assert service.last_refresh_ok is True
+        assert await service.list_mountpoints() == [MOUNTPOINTS[0]]
+        assert (await service.snapshot())[1] is True
+        await service.aclose()
+
+
+@asynccontextmanager
+async def fake_janus():
+    """Minimal Janus Core API over WebSocket; records every request frame."""
+    frames = []
+
+    async def reply_later(ws, reply, body):
+        # Lets tests make Janus answer plugin messages out of order
+        await asyncio.sleep(body.get("delay", 0))
+        await ws.send_json({**reply, "janus": "event", "plugindata": {
+            "plugin": "janus.plugin.streaming",
+            "data": {"echo": body["request"]}
+        }})
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            frame = message.json()
+            frames.append(frame)
+            reply = {"transaction": frame["transaction"]}
+            if frame["janus"] == "create":
+                reply.update(janus="success", data={"id": 11})
+            elif frame["janus"] == "attach":
+                reply.update(janus="success", data={"id": 22})
+            elif frame["janus"] == "info":
+                reply.update(janus="server_info", name="Janus WebRTC Server")
+            elif frame["janus"] == "message" and frame["body"]["request"] in ("list", "info"):
+                # Synchronous streaming requests get their plugin reply directly, without an ack
+                body = frame["body"]
+                data = {"echo": body["request"]}
+                if "id" in body:
+                    data["info"] = {"id": body["id"], "streaming": True}
+                reply.update(janus="success", plugindata={"plugin": "janus.plugin.streaming", "data": data})
+            elif frame["janus"] == "message":
+                await ws.send_json({**reply, "janus": "ack"})
+                asyncio.ensure_future(reply_later(ws, reply, frame["body"]))
+                continue
+            else:
+                reply.update(janus="ack")
+            await ws.send_json(reply)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"ws://127.0.0.1:{port}/", frames
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_core_api_reuses_one_attached_session(service):
+    async with fake_janus() as (url, frames):
+        service.core_ws_url = url
+        assert await service._core_api_flow({"request": "list"}) == {"echo": "list"}
+        assert await service._core_api_flow({"request": "info"}) == {"echo": "info"}
+        await service.aclose()
+    assert [f["janus"] for f in frames] == ["create", "attach", "message", "message"]
+    assert all(f["session_id"] == 11 and f["handle_id"] == 22 for f in frames[2:])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_core_api_calls_get_their_own_replies(service):
+    async with fake_janus() as (url, frames):
+        service.core_ws_url = url
+        slow, fast = await asyncio.gather(
+            service._core_api_flow({"request": "slow", "delay": 0.05}),
+            service._core_api_flow({"request": "fast"}),
+        )
+        await service.aclose()
+    assert (slow, fast) == ({"echo": "slow"}, {"echo": "fast"})
+    assert [f["janus"] for f in frames].count("attach") == 1
+    transactions = [f["transaction"] for f in frames]
+    assert len(set(transactions)) == len(transactions)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_a_failed_fetch(service):
+    async def failing_fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("janus down")
+
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(side_effect=failing_fetch)) as fetch:
+        results = await asyncio.gather(*(service.get_mountpoint_info(1) for _ in range(10)), return_exceptions=True)
+    assert fetch.await_count == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert service._mp_inflight is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_fetch_is_not_overwritten(service):
+    release = asyncio.Event()
+
+    async def fetch():
+        if fetch_mock.await_count == 1:
+            await release.wait()
+            return [{"id": 1, "streaming": False}]
+        return MOUNTPOINTS
+
+    with patch.object(service, "_fetch_mountpoints", AsyncMock(side_effect=fetch)) as fetch_mock:
+        stale = asyncio.ensure_future(service.list_mountpoints())
+        await asyncio.sleep(0)
+        service.invalidate_mountpoint_cache()
+        assert await service.list_mountpoints() == MOUNTPOINTS
+        release.set()
+        assert await stale == [{"id": 1, "streaming": False}]
+        assert await service.list_mountpoints() == MOUNTPOINTS
+    assert fetch_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_health_check_asks_janus_info_on_the_shared_socket(service):
+    assert await service.server_info() is None  # nothing attached yet: no new connection
+    async with fake_janus() as (url, frames):
+        service.core_ws_url = url
+        await service._core_api_flow({"request": "list"})
+        assert await service.health_check() is True
+        await service.aclose()
+    assert frames[-1]["janus"] == "info"
+    assert [f["janus"] for f in frames].count("create") == 1
+
+
+@pytest.mark.asyncio
+async def test_core_api_batch_sends_all_before_awaiting_replies(service):
+    async with fake_janus() as (url, frames):
+        service.core_ws_url = url
+        replies = await service._core_api_flow_batch([
+            {"request": "slow", "delay": 0.05},
+            {"request": "fast"},
+            {"request": "info", "id": 1},
+        ])
+        await service.aclose()
+    assert replies == [{"echo": "slow"}, {"echo": "fast"}, {"echo": "info", "info": {"id": 1, "streaming": True}}]
+    assert [f["janus"] for f in frames] == ["create", "attach", "message", "message", "message"]
+    assert not service._pending
+
+
+@pytest.mark.asyncio
+async def test_list_mountpoint_infos_returns_synchronous_info_replies(service):
+    async with fake_janus() as (url, frames):
+        service.core_ws_url = url
+        infos = await asyncio.wait_for(service.list_mountpoint_infos([1, 2]), JanusService.REQUEST_TIMEOUT / 5)
+        await service.aclose()
+    assert infos == [{"id": 1, "streaming": True}, {"id": 2, "streaming": True}]
+    assert [f["body"] for f in frames if f["janus"] == "message"] == [{"request": "info", "id": 1}, {"request": "info", "id": 2}]
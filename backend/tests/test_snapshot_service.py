@@ -0,0 +1,30 @@
+import pytest
+import uuid
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.models import Device, DeviceStatus, uuid7
+from app.services.snapshot_service import SnapshotService
+
+
+@pytest.mark.asyncio
+async def test_capture_releases_db_connection_before_ffmpeg():
+    db = MagicMock()
+    device = Device(id="05a9a734-f76d-4f45-9b0e-1e9c89b43e2c", status=DeviceStatus.ONLINE,
+                    rtsp_url="rtsp://192.168.1.10:554/stream1")
+
+    async def capture(captured):
+        assert db.expunge.called and db.commit.called, "DB connection must be released before FFmpeg runs"
+        return b"jpeg", 640, 480
+
+    service = SnapshotService()
+    with patch.object(service, "_capture_image_from_rtsp", AsyncMock(side_effect=capture)):
+        snapshot = await service.capture_snapshot(device, db)
+    db.expunge.assert_called_once_with(device)
+    assert snapshot.file_size == 4
+    assert db.commit.call_count == 2
+
+
+def test_uuid7_ids_are_time_ordered():
+    with patch("app.models.time.time_ns", side_effect=[1_700_000_000_000_000_000, 1_700_000_000_001_000_000]):
+        first, second = uuid7(), uuid7()
+    assert (first.version, first.variant) == (7, uuid.RFC_4122)
+    assert first < second
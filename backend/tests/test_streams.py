@@ -0,0 +1,185 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch, AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import get_db
+from app.api.dependencies import get_current_user
+from app.models import Device, DeviceStatus as DeviceModelStatus
+
+DEVICE_ID = "05a9a734-f76d-4f45-9b0e-1e9c89b43e2c"
+MOUNTPOINT = {"id": 1, "description": "Live Camera 1", "streaming": True, "enabled": True}
+
+
+def make_device():
+    device = MagicMock()
+    device.id = DEVICE_ID
+    device.status = DeviceModelStatus.ONLINE
+    device.to_stream_dict.return_value = {
+        "id": DEVICE_ID,
+        "name": "Live Camera 1",
+        "description": None,
+        "device_type": "ip_camera",
+        "ip_address": "192.168.1.10",
+        "rtsp_url": "rtsp://192.168.1.10:554/stream1",
+        "created_at": datetime(2024, 1, 1),
+        "updated_at": datetime(2024, 1, 1),
+    }
+    return device
+
+
+@pytest.fixture
+def db():
+    session = MagicMock()
+    device = make_device()
+    session.query.return_value.all.return_value = [device]
+    session.query.return_value.filter.return_value.first.return_value = device
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: {"username": "admin"}
+    yield session
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def janus_call(db, result):
+    """Janus stand-in that fails if the DB connection is still checked out."""
+    async def call(*args, **kwargs):
+        assert db.close.called, "DB session must be released before awaiting Janus"
+        return result
+    return AsyncMock(side_effect=call)
+
+
+def test_list_streams_releases_session_before_janus(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_map", janus_call(db, {1: MOUNTPOINT})):
+        response = client.get("/api/streams/")
+    assert response.status_code == 200
+    assert response.json()[0]["status"] == "active"
+
+
+@pytest.mark.filterwarnings("error::UserWarning")
+def test_list_streams_serializes_unvalidated_models(client, db):
+    mountpoint = {**MOUNTPOINT, "type": "rtsp", "metadata": "VAS Live Camera 1"}
+    with patch("app.api.streams.janus_service.get_mountpoint_map", AsyncMock(return_value={1: mountpoint})):
+        response = client.get("/api/streams/")
+    assert response.status_code == 200
+    stream = response.json()[0]
+    assert stream["created_at"] == "2024-01-01T00:00:00"
+    assert stream["mountpoint_info"]["id"] == 1
+    assert "type" not in stream["mountpoint_info"]
+
+
+def test_start_stream_releases_session_before_janus(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", janus_call(db, MOUNTPOINT)) as info:
+        response = client.post(f"/api/streams/{DEVICE_ID}/start")
+    assert response.status_code == 200
+    assert response.json()["status"] == "active"
+    info.assert_awaited_once_with(1)
+
+
+def test_start_stream_unavailable_when_mountpoint_not_streaming(client, db):
+    idle = {**MOUNTPOINT, "streaming": False}
+    with patch("app.api.streams.janus_service.get_mountpoint_info", janus_call(db, idle)):
+        response = client.post(f"/api/streams/{DEVICE_ID}/start")
+    assert response.status_code == 503
+
+
+def test_stream_status_releases_session_before_janus(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", janus_call(db, MOUNTPOINT)):
+        response = client.get(f"/api/streams/{DEVICE_ID}/status")
+    assert response.status_code == 200
+    assert response.json()["mountpoint_info"]["id"] == 1
+
+
+def test_device_stream_dict_leaves_out_device_status():
+    device = Device(id=DEVICE_ID, name="cam", status=DeviceModelStatus.ONLINE)
+    data = device.to_stream_dict()
+    assert "status" not in data
+    assert data["id"] == DEVICE_ID
+    assert device.to_dict()["status"] == DeviceModelStatus.ONLINE
+
+
+def test_webrtc_stream_lookup_by_mountpoint_id(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=MOUNTPOINT)) as info:
+        assert client.get("/api/streams/webrtc/streams/1").json()["status"] == "active"
+        assert client.get("/api/streams/webrtc/streams/camera-1").status_code == 404
+    info.assert_awaited_once_with(1)
+
+
+def test_webrtc_system_status_counts(client, db):
+    mountpoints = [MOUNTPOINT, {"id": 2, "streaming": False, "enabled": False}, {"id": 3}]
+    with patch("app.api.streams.janus_service.list_mountpoints", AsyncMock(return_value=mountpoints)):
+        body = client.get("/api/streams/webrtc/system/status").json()
+    assert body["system_status"] == "healthy"
+    assert (body["total_streams"], body["active_streams"], body["enabled_streams"]) == (3, 1, 2)
+    assert (body["inactive_streams"], body["disabled_streams"]) == (2, 1)
+
+
+def test_iso_now_is_cached_per_second():
+    from app.api import streams
+    with patch("app.api.streams.time.time", return_value=1704067200.25):
+        first = streams.iso_now()
+    with patch("app.api.streams.time.time", return_value=1704067200.75), \
+         patch("app.api.streams.datetime") as dt:
+        assert streams.iso_now() == first == "2024-01-01T00:00:00"
+    dt.utcfromtimestamp.assert_not_called()
+
+
+def test_webrtc_connection_config(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=MOUNTPOINT)):
+        body = client.get(f"/api/streams/webrtc/streams/{DEVICE_ID}/config").json()
+    assert body["mountpoint_id"] == body["stream_id"] == 1
+    assert body["plugin"] == "janus.plugin.streaming"
+    assert body["janus_websocket_url"].startswith("ws://")
+    assert len(body["ice_servers"]) == 2
+    assert body["stream_info"]["name"] == "Live Camera 1"
+
+
+def test_static_mountpoints_serialize(client, db):
+    from app.api.streams import janus_service
+    janus_service.invalidate_mountpoint_cache()
+    body = client.get("/api/streams/janus/mountpoints").json()
+    assert [mp["id"] for mp in body["mountpoints"]] == [1, 2]
+    stream = client.get(f"/api/streams/{DEVICE_ID}/status").json()
+    assert stream["mountpoint_info"]["description"] == "Live Camera 1 - Office"
+    assert client.get("/api/streams/").json()[0]["status"] == "active"
+
+
+def test_webrtc_system_status_degraded_without_active_streams(client, db):
+    idle = [{"id": 1, "streaming": False}]
+    with patch("app.api.streams.janus_service.list_mountpoints", AsyncMock(return_value=idle)):
+        body = client.get("/api/streams/webrtc/system/status").json()
+    assert body["system_status"] == "degraded"
+    assert body["webrtc_gateway_ready"] is False
+
+
+def test_webrtc_connection_config_rejects_unknown_stream_before_janus(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=None)) as info:
+        assert client.get("/api/streams/webrtc/streams/not-a-stream/config").status_code == 404
+        assert client.get("/api/streams/webrtc/streams/2/config").status_code == 404
+    info.assert_awaited_once_with(2)
+
+
+def test_webrtc_stream_status_parses_stream_id_once(client, db):
+    with patch("app.api.streams.janus_service.list_mountpoints", AsyncMock(return_value=[MOUNTPOINT])), \
+         patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=MOUNTPOINT)) as info:
+        assert client.get("/api/streams/webrtc/streams/1/status").json()["status"] == "active"
+        assert client.get("/api/streams/webrtc/streams/abc/status").json()["status"] == "not_found"
+    info.assert_awaited_once_with(1)
+
+
+def test_webrtc_stream_lookup_rejects_non_ascii_digits(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=MOUNTPOINT)) as info:
+        assert client.get("/api/streams/webrtc/streams/²").status_code == 404
+        assert client.get("/api/streams/webrtc/streams/①/status").json()["status"] == "not_found"
+    info.assert_not_awaited()
+
+
+def test_webrtc_connection_config_rejects_non_ascii_digits(client, db):
+    with patch("app.api.streams.janus_service.get_mountpoint_info", AsyncMock(return_value=MOUNTPOINT)) as info:
+        assert client.get("/api/streams/webrtc/streams/²/config").status_code == 404
+    info.assert_not_awaited()
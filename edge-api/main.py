@@ -4,7 +4,10 @@ Manages local unit operations and reports to central dashboard
 """
 
 import os
+import glob
 import json
+import time
+import heapq
 import asyncio
 import logging
 from datetime import datetime, timezone
@@ -13,8 +16,10 @@ from contextlib import asynccontextmanager
 
 import psutil
 import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 
 # Configure logging
@@ -30,9 +35,39 @@ VAS_BACKEND_URL = os.getenv("VAS_BACKEND_URL", "http://vas-backend-edge:8000")
 CENTRAL_DASHBOARD_URL = os.getenv("CENTRAL_DASHBOARD_URL", "")
 REPORT_INTERVAL = int(os.getenv("REPORT_INTERVAL", "30"))  # seconds
 INTEL_ARC_ENABLED = os.getenv("INTEL_ARC_ENABLED", "true").lower() == "true"
+METRICS_TTL = int(os.getenv("METRICS_TTL_SECONDS", "5"))  # seconds
+GPU_POLL_INTERVAL = int(os.getenv("GPU_POLL_INTERVAL_SECONDS", "10"))  # seconds
+DISK_POLL_INTERVAL = 60  # seconds
+GPU_PROBE_MAX_FAILURES = 3
+GPU_PROBE_BACKOFF = 3600  # seconds to stop probing after repeated failures
+BOOT_TIME = psutil.boot_time()  # constant for the life of the process
+
+GPU_SYSFS_CARD = os.getenv("GPU_SYSFS_CARD", "/sys/class/drm/card0")
+GPU_SYSFS_FILES = {
+    "act": "gt_act_freq_mhz",
+    "max": "gt/gt0/rps_max_freq_mhz",
+}
 
 # Global state
-reporting_task = None
+scheduler_task = None
+http_client: Optional[httpx.AsyncClient] = None  # shared keep-alive pool, created in lifespan
+gpu_sysfs_fds: Dict[str, int] = {}
+gpu_render_prev = None  # (monotonic_ns, render busy ns) from the previous sample
+gpu_metrics = (None, None)  # (gpu_percent, gpu_freq_ratio) from the last GPU poll
+gpu_probe_failures = 0
+disk_usage_percent = 0.0  # from the last disk poll
+last_metrics_update = 0.0
+metrics_refresh: Optional[asyncio.Task] = None  # in-flight refresh shared by concurrent callers
+health_body = (0, b"")  # (epoch second, encoded /health body) reused within the same second
+# Camera entries are built once; each refresh only stamps last_seen
+camera_status = {
+    str(i): {
+        "id": i,
+        "status": "active",  # Simplified - would check actual RTSP status
+        "stream_url": f"http://localhost:8088/janus/streaming/{i}"
+    }
+    for i in range(1, MAX_CAMERAS + 1)
+}
 unit_status = {
     "unit_id": UNIT_ID,
     "status": "initializing",
@@ -63,92 +98,209 @@ class PerformanceMetrics(BaseModel):
     active_streams: int
     janus_sessions: int
 
-# Background reporting task
-async def report_to_central():
-    """Background task to report unit status to central dashboard"""
+# Intel GPU sampling via sysfs and DRM fdinfo (no intel_gpu_top subprocess)
+def open_gpu_sysfs():
+    """Open the GPU frequency files once so each sample is a single pread"""
+    for name, relpath in GPU_SYSFS_FILES.items():
+        try:
+            gpu_sysfs_fds[name] = os.open(os.path.join(GPU_SYSFS_CARD, relpath), os.O_RDONLY)
+        except OSError as e:
+            logger.info(f"GPU sysfs file {relpath} unavailable: {e}")
+
+def close_gpu_sysfs():
+    for fd in gpu_sysfs_fds.values():
+        os.close(fd)
+    gpu_sysfs_fds.clear()
+
+def read_render_busy_ns() -> Optional[int]:
+    """Sum drm-engine-render busy time across all DRM clients (kernel 5.19+ fdinfo)"""
+    total = 0
+    found = False
+    seen_clients = set()
+    for path in glob.glob("/proc/[0-9]*/fdinfo/*"):
+        try:
+            with open(path) as f:
+                text = f.read()
+        except OSError:
+            continue
+        if "drm-engine-render" not in text:
+            continue
+        client_id = None
+        busy_ns = 0
+        for line in text.splitlines():
+            key, _, value = line.partition(":")
+            if key == "drm-client-id":
+                client_id = value.strip()
+            elif key == "drm-engine-render":
+                busy_ns = int(value.split()[0])
+        # Several fds can share one DRM client; count each client once
+        if client_id in seen_clients:
+            continue
+        seen_clients.add(client_id)
+        total += busy_ns
+        found = True
+    return total if found else None
+
+def sample_gpu_metrics():
+    """Return (render engine utilization %, actual/max frequency ratio)"""
+    global gpu_render_prev
+    
+    freq_ratio = None
+    if "act" in gpu_sysfs_fds and "max" in gpu_sysfs_fds:
+        act = int(os.pread(gpu_sysfs_fds["act"], 32, 0))
+        max_freq = int(os.pread(gpu_sysfs_fds["max"], 32, 0))
+        if max_freq:
+            freq_ratio = act / max_freq
+    
+    gpu_percent = None
+    busy_ns = read_render_busy_ns()
+    if not gpu_sysfs_fds and busy_ns is None:
+        raise OSError("No Intel GPU sysfs files or DRM fdinfo counters available")
+    if busy_ns is not None:
+        now_ns = time.monotonic_ns()
+        if gpu_render_prev is not None:
+            prev_ts, prev_busy = gpu_render_prev
+            elapsed = now_ns - prev_ts
+            # Clients exiting between samples can make the sum go backwards
+            if elapsed > 0:
+                gpu_percent = min(100.0, max(0.0, (busy_ns - prev_busy) / elapsed * 100))
+        gpu_render_prev = (now_ns, busy_ns)
+    
+    return gpu_percent, freq_ratio
+
+# Periodic jobs. Each returns the delay in seconds until its next run, or None
+# to stop, and all of them are driven by run_scheduler from a single task.
+async def run_scheduler(jobs):
+    """Run periodic jobs from one task, ordered by their next due time"""
+    queue = [(time.monotonic(), index, job) for index, job in enumerate(jobs)]
+    heapq.heapify(queue)
+    
+    while queue:
+        due, index, job = heapq.heappop(queue)
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        try:
+            next_delay = await job()
+        except Exception as e:
+            logger.error(f"Periodic job {job.__name__} failed and was stopped: {e}")
+            continue
+        if next_delay is not None:
+            heapq.heappush(queue, (time.monotonic() + next_delay, index, job))
+
+async def report_to_central_once():
+    """Report unit status to central dashboard"""
     if not CENTRAL_DASHBOARD_URL:
         logger.info("No central dashboard URL configured, skipping reporting")
-        return
+        return None
     
-    async with httpx.AsyncClient() as client:
-        while True:
-            try:
-                # Collect current metrics
-                await update_unit_metrics()
-                
-                # Report to central dashboard
-                response = await client.post(
-                    f"{CENTRAL_DASHBOARD_URL}/api/units/{UNIT_ID}/status",
-                    json=unit_status,
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    logger.debug(f"Successfully reported to central dashboard")
-                else:
-                    logger.warning(f"Central dashboard returned status {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to report to central dashboard: {e}")
+    try:
+        # Collect current metrics
+        await update_unit_metrics()
+        
+        # Report to central dashboard
+        response = await http_client.post(
+            f"{CENTRAL_DASHBOARD_URL}/api/units/{UNIT_ID}/status",
+            content=orjson.dumps(unit_status),
+            headers={"content-type": "application/json"},
+            timeout=10.0
+        )
+        
+        if response.status_code == 200:
+            logger.debug(f"Successfully reported to central dashboard")
+        else:
+            logger.warning(f"Central dashboard returned status {response.status_code}")
             
-            await asyncio.sleep(REPORT_INTERVAL)
+    except Exception as e:
+        logger.error(f"Failed to report to central dashboard: {e}")
+    
+    return REPORT_INTERVAL
+
+async def poll_gpu_once():
+    """Sample GPU metrics (Intel Arc), backing off for an hour once the probe
+    keeps failing on this unit"""
+    global gpu_metrics, gpu_probe_failures
+    
+    if not INTEL_ARC_ENABLED:
+        return None
+    
+    try:
+        gpu_metrics = await asyncio.to_thread(sample_gpu_metrics)
+        gpu_probe_failures = 0
+    except Exception as e:
+        logger.debug(f"Failed to sample GPU metrics: {e}")
+        gpu_metrics = (None, None)
+        gpu_probe_failures += 1
+        if gpu_probe_failures >= GPU_PROBE_MAX_FAILURES:
+            logger.warning(
+                f"GPU probe failed {gpu_probe_failures} times, "
+                f"disabling it for {GPU_PROBE_BACKOFF}s"
+            )
+            gpu_probe_failures = 0
+            return GPU_PROBE_BACKOFF
+    
+    return GPU_POLL_INTERVAL
+
+async def poll_disk_once():
+    """Refresh disk usage; it changes slowly so this runs on a long interval"""
+    global disk_usage_percent
+    
+    try:
+        disk_usage = await asyncio.to_thread(psutil.disk_usage, '/')
+        disk_usage_percent = disk_usage.percent
+    except Exception as e:
+        logger.warning(f"Failed to read disk usage: {e}")
+    
+    return DISK_POLL_INTERVAL
 
 async def update_unit_metrics():
-    """Update unit performance metrics and camera status"""
-    global unit_status
+    """Update unit performance metrics and camera status
+    
+    Results are cached for METRICS_TTL seconds so request-driven refreshes
+    cost nothing when the background loop (or another request) sampled recently.
+    Concurrent callers share a single in-flight refresh.
+    """
+    global metrics_refresh
+    
+    if time.monotonic() - last_metrics_update < METRICS_TTL:
+        return
+    
+    if metrics_refresh is None or metrics_refresh.done():
+        metrics_refresh = asyncio.create_task(refresh_unit_metrics())
+    # Shielded so a cancelled request does not cancel the refresh for the others
+    await asyncio.shield(metrics_refresh)
+
+async def refresh_unit_metrics():
+    global unit_status, last_metrics_update
     
     try:
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
+        # One timestamp for the whole tick
+        now_iso = datetime.now(timezone.utc).isoformat()
+        
+        # System metrics; interval=None reports usage since the previous call
+        # instead of sleeping on the event loop
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = await asyncio.to_thread(psutil.virtual_memory)
         
-        # GPU metrics (Intel Arc)
-        gpu_percent = None
-        if INTEL_ARC_ENABLED:
-            try:
-                # Try to get Intel GPU usage (would need intel-gpu-tools)
-                import subprocess
-                result = subprocess.run(
-                    ["intel_gpu_top", "-l", "1", "-s", "100"],
-                    capture_output=True, text=True, timeout=5
-                )
-                # Parse intel_gpu_top output (simplified)
-                if result.returncode == 0:
-                    # This is a simplified parser - actual implementation would be more robust
-                    lines = result.stdout.split('\n')
-                    for line in lines:
-                        if 'Render/3D' in line:
-                            # Extract percentage (this is a simplified example)
-                            gpu_percent = 0.0  # Placeholder
-                            break
-            except Exception:
-                gpu_percent = None
+        # GPU and disk usage come from their own scheduled polls
+        gpu_percent, gpu_freq_ratio = gpu_metrics
         
         # Janus metrics
         janus_sessions = 0
         active_streams = 0
         try:
-            async with httpx.AsyncClient() as client:
-                # Get Janus info
-                janus_response = await client.get(f"{JANUS_HTTP_URL}/janus/info", timeout=5)
-                if janus_response.status_code == 200:
-                    # Get session count from admin API
-                    admin_response = await client.get(f"{JANUS_ADMIN_URL}/sessions", timeout=5)
-                    if admin_response.status_code == 200:
-                        admin_data = admin_response.json()
-                        janus_sessions = len(admin_data.get("sessions", {}))
+            # The admin sessions call doubles as the liveness probe
+            admin_response = await http_client.get(f"{JANUS_ADMIN_URL}/sessions", timeout=5)
+            if admin_response.status_code == 200:
+                admin_data = admin_response.json()
+                janus_sessions = len(admin_data.get("sessions", {}))
         except Exception as e:
             logger.warning(f"Failed to get Janus metrics: {e}")
         
         # Camera status
-        camera_status = {}
-        for i in range(1, MAX_CAMERAS + 1):
-            camera_status[str(i)] = {
-                "id": i,
-                "status": "active",  # Simplified - would check actual RTSP status
-                "stream_url": f"http://localhost:8088/janus/streaming/{i}",
-                "last_seen": datetime.now(timezone.utc).isoformat()
-            }
+        for camera in camera_status.values():
+            camera["last_seen"] = now_iso
         
         # Update global status
         unit_status.update({
@@ -158,14 +310,16 @@ async def update_unit_metrics():
                 "cpu_percent": cpu_percent,
                 "memory_percent": memory.percent,
                 "gpu_percent": gpu_percent,
+                "gpu_freq_ratio": gpu_freq_ratio,
                 "camera_count": MAX_CAMERAS,
                 "active_streams": active_streams,
                 "janus_sessions": janus_sessions,
-                "uptime_seconds": psutil.boot_time(),
-                "disk_usage_percent": psutil.disk_usage('/').percent
+                "uptime_seconds": time.time() - BOOT_TIME,
+                "disk_usage_percent": disk_usage_percent
             },
-            "last_update": datetime.now(timezone.utc).isoformat()
+            "last_update": now_iso
         })
+        last_metrics_update = time.monotonic()
         
     except Exception as e:
         logger.error(f"Failed to update unit metrics: {e}")
@@ -175,21 +329,38 @@ async def update_unit_metrics():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global reporting_task
+    global scheduler_task, http_client
     logger.info(f"Starting Edge API for Unit {UNIT_ID}")
     
-    # Start background reporting task
-    reporting_task = asyncio.create_task(report_to_central())
+    # Prime the CPU counters so the first non-blocking sample is meaningful
+    psutil.cpu_percent(interval=None)
+    if INTEL_ARC_ENABLED:
+        open_gpu_sysfs()
+    
+    # One client for every outbound call so connections are kept alive
+    http_client = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+    )
+    
+    # Start the periodic jobs
+    scheduler_task = asyncio.create_task(run_scheduler([
+        report_to_central_once,
+        poll_gpu_once,
+        poll_disk_once,
+    ]))
     
     yield
     
     # Shutdown
-    if reporting_task:
-        reporting_task.cancel()
+    if scheduler_task:
+        scheduler_task.cancel()
         try:
-            await reporting_task
+            await scheduler_task
         except asyncio.CancelledError:
             pass
+    await http_client.aclose()
+    close_gpu_sysfs()
     logger.info("Edge API shutdown complete")
 
 # Create FastAPI app
@@ -197,6 +368,7 @@ app = FastAPI(
     title="VAS Edge API",
     description=f"Edge API for ASRock Unit {UNIT_ID}",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -212,24 +384,34 @@ app.add_middleware(
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "unit_id": UNIT_ID,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "service": "edge-api"
-    }
+    # Probed frequently; the encoded body is reused for the rest of the second
+    global health_body
+    
+    now = time.time()
+    if int(now) != health_body[0]:
+        health_body = (int(now), orjson.dumps({
+            "status": "healthy",
+            "unit_id": UNIT_ID,
+            "timestamp": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "service": "edge-api"
+        }))
+    
+    return Response(content=health_body[1], media_type="application/json")
 
 # Unit status endpoint
-@app.get("/status", response_model=UnitStatus)
+# Both endpoints return data this service just built, so they bypass response
+# validation; the models are kept in `responses` for the OpenAPI schema.
+@app.get("/status", response_model=None, responses={200: {"model": UnitStatus}})
 async def get_unit_status():
     await update_unit_metrics()
-    return unit_status
+    return ORJSONResponse(unit_status)
 
 # Performance metrics endpoint
-@app.get("/metrics", response_model=PerformanceMetrics)
+@app.get("/metrics", response_model=None, responses={200: {"model": PerformanceMetrics}})
 async def get_performance_metrics():
     await update_unit_metrics()
-    return PerformanceMetrics(**unit_status["performance"])
+    metrics = PerformanceMetrics.model_construct(**unit_status["performance"])
+    return ORJSONResponse(metrics.model_dump())
 
 # Camera management endpoints
 @app.get("/cameras")
@@ -265,9 +447,8 @@ async def restart_camera(camera_id: str):
 async def get_janus_info():
     """Proxy to Janus info endpoint"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{JANUS_HTTP_URL}/janus/info", timeout=10)
-            return response.json()
+        response = await http_client.get(f"{JANUS_HTTP_URL}/janus/info", timeout=10)
+        return response.json()
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Janus not available: {e}")
 
@@ -275,9 +456,8 @@ async def get_janus_info():
 async def get_janus_sessions():
     """Get active Janus sessions"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{JANUS_ADMIN_URL}/sessions", timeout=10)
-            return response.json()
+        response = await http_client.get(f"{JANUS_ADMIN_URL}/sessions", timeout=10)
+        return response.json()
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Janus admin not available: {e}")
 
@@ -287,12 +467,20 @@ async def restart_system(background_tasks: BackgroundTasks):
     """Restart the entire edge unit (use with caution)"""
     logger.warning(f"System restart requested for unit {UNIT_ID}")
     
-    def restart_containers():
-        import subprocess
+    async def restart_containers():
+        proc = None
         try:
-            subprocess.run(["docker-compose", "-f", "docker-compose.asrock-edge.yml", "restart"], 
-                         check=True, timeout=60)
+            proc = await asyncio.create_subprocess_exec(
+                "docker-compose", "-f", "docker-compose.asrock-edge.yml", "restart",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout=60)
+            if proc.returncode != 0:
+                logger.error(f"Failed to restart containers: {stderr.decode(errors='replace')}")
         except Exception as e:
+            if proc and proc.returncode is None:
+                proc.kill()
             logger.error(f"Failed to restart containers: {e}")
     
     background_tasks.add_task(restart_containers)
@@ -308,7 +496,9 @@ async def get_unit_config():
         "janus_url": JANUS_HTTP_URL,
         "central_dashboard": CENTRAL_DASHBOARD_URL,
         "intel_arc_enabled": INTEL_ARC_ENABLED,
-        "report_interval": REPORT_INTERVAL
+        "report_interval": REPORT_INTERVAL,
+        "metrics_ttl": METRICS_TTL,
+        "gpu_poll_interval": GPU_POLL_INTERVAL
     }
 
 # Future: AI inference endpoints (placeholder)
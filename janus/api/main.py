@@ -6,13 +6,15 @@ Fast, async API service for managing camera streams via Janus
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import asyncio
 import aiohttp
 import logging
+import orjson
+import redis.asyncio as redis
 from typing import Dict, List, Optional
 import json
-import uuid
+import itertools
 from pydantic import BaseModel
 import os
 
@@ -25,7 +27,8 @@ app = FastAPI(
     description="RESTful API for managing IP camera streams via Janus WebRTC Gateway",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for web frontend
@@ -41,11 +44,28 @@ app.add_middleware(
 JANUS_HTTP_URL = os.getenv("JANUS_HTTP_URL", "http://localhost:8088/janus")
 JANUS_ADMIN_URL = os.getenv("JANUS_ADMIN_URL", "http://localhost:7088/admin")
 JANUS_WS_URL = os.getenv("JANUS_WS_URL", "ws://localhost:8188/janus")
+REDIS_URL = os.getenv("REDIS_URL", "")
 
-# In-memory store for camera configurations (use Redis/DB in production)
+# Camera configurations. With REDIS_URL set, Redis is the source of truth and
+# this dict is the worker's local copy, kept current through Pub/Sub events;
+# without it the store is process-local (single worker only).
 cameras_store: Dict[str, dict] = {}
 active_sessions: Dict[str, dict] = {}
 
+# Stream ID allocator: fresh IDs from a counter, freed IDs reused first
+_next_stream_id = itertools.count(1)
+_free_stream_ids: List[int] = []
+
+# Redis keys shared by all workers
+CAMERA_KEY_PREFIX = "vas:cam:"
+CAMERA_INDEX_KEY = "vas:cams"
+CAMERA_EVENTS_CHANNEL = "vas:cam:events"
+STREAM_ID_COUNTER_KEY = "vas:stream_ids:next"
+FREE_STREAM_IDS_KEY = "vas:stream_ids:free"
+
+redis_client: Optional[redis.Redis] = None
+camera_events_task: Optional[asyncio.Task] = None
+
 # Pydantic models
 class CameraConfig(BaseModel):
     camera_id: str
@@ -67,19 +87,44 @@ class StreamRequest(BaseModel):
     camera_id: str
 
 
+# Janus error codes meaning the session or handle has gone away (e.g. timed out)
+JANUS_ERROR_SESSION_NOT_FOUND = 458
+JANUS_ERROR_HANDLE_NOT_FOUND = 459
+
+
 class JanusClient:
     """Async Janus HTTP API Client"""
     
     def __init__(self):
         self.session = None
+        # Janus only needs transaction ids to be unique per process
+        self._tx = itertools.count(1)
+        # One streaming-plugin handle shared by all mountpoint management calls
+        self._mgmt_session_id: Optional[str] = None
+        self._mgmt_handle_id: Optional[str] = None
+        self._mgmt_lock = asyncio.Lock()
+        
+    def transaction_id(self) -> str:
+        return f"t{next(self._tx)}"
         
     async def get_session(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        # Single process-wide session; the connector keeps Janus connections alive
+        if not self.session or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=64, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                # aiohttp expects a str from the serializer
+                json_serialize=lambda obj: orjson.dumps(obj).decode()
+            )
         return self.session
         
     async def close(self):
         if self.session:
+            if self._mgmt_session_id:
+                try:
+                    await self.destroy_session(self._mgmt_session_id)
+                except Exception as e:
+                    logger.warning(f"Failed to destroy management session: {e}")
             await self.session.close()
             
     async def create_session(self) -> str:
@@ -87,7 +132,7 @@ class JanusClient:
         session = await self.get_session()
         payload = {
             "janus": "create",
-            "transaction": str(uuid.uuid4())
+            "transaction": self.transaction_id()
         }
         
         async with session.post(JANUS_HTTP_URL, json=payload) as response:
@@ -108,7 +153,7 @@ class JanusClient:
         payload = {
             "janus": "attach",
             "plugin": plugin_name,
-            "transaction": str(uuid.uuid4())
+            "transaction": self.transaction_id()
         }
         
         url = f"{JANUS_HTTP_URL}/{session_id}"
@@ -123,7 +168,7 @@ class JanusClient:
         session = await self.get_session()
         payload = {
             "janus": "message",
-            "transaction": str(uuid.uuid4()),
+            "transaction": self.transaction_id(),
             "body": message
         }
         
@@ -133,12 +178,39 @@ class JanusClient:
                 raise HTTPException(status_code=500, detail="Failed to send message")
             return await response.json()
             
+    async def get_management_handle(self):
+        """Return the shared (session_id, handle_id), creating it on first use"""
+        async with self._mgmt_lock:
+            if not self._mgmt_handle_id:
+                session_id = await self.create_session()
+                self._mgmt_handle_id = await self.attach_plugin(session_id, "janus.plugin.streaming")
+                self._mgmt_session_id = session_id
+            return self._mgmt_session_id, self._mgmt_handle_id
+            
+    async def send_management_message(self, message: dict):
+        """Send a mountpoint management request through the shared handle
+        
+        If Janus has dropped the session (e.g. it timed out), a new one is
+        created and the request is retried once.
+        """
+        for attempt in range(2):
+            session_id, handle_id = await self.get_management_handle()
+            data = await self.send_message(session_id, handle_id, message)
+            error_code = data.get("error", {}).get("code") if data.get("janus") == "error" else None
+            if error_code not in (JANUS_ERROR_SESSION_NOT_FOUND, JANUS_ERROR_HANDLE_NOT_FOUND):
+                return data
+            async with self._mgmt_lock:
+                if self._mgmt_handle_id == handle_id:
+                    self._mgmt_session_id = None
+                    self._mgmt_handle_id = None
+        return data
+            
     async def destroy_session(self, session_id: str):
         """Destroy Janus session"""
         session = await self.get_session()
         payload = {
             "janus": "destroy",
-            "transaction": str(uuid.uuid4())
+            "transaction": self.transaction_id()
         }
         
         url = f"{JANUS_HTTP_URL}/{session_id}"
@@ -148,14 +220,103 @@ class JanusClient:
 # Global Janus client
 janus_client = JanusClient()
 
+async def allocate_stream_id() -> int:
+    """Take a freed stream ID if there is one, otherwise the next fresh one"""
+    if redis_client:
+        freed = await redis_client.spop(FREE_STREAM_IDS_KEY)
+        if freed is not None:
+            return int(freed)
+        return await redis_client.incr(STREAM_ID_COUNTER_KEY)
+    return _free_stream_ids.pop() if _free_stream_ids else next(_next_stream_id)
+
+async def release_stream_id(stream_id: int):
+    if redis_client:
+        await redis_client.sadd(FREE_STREAM_IDS_KEY, stream_id)
+    else:
+        _free_stream_ids.append(stream_id)
+
+async def reserve_camera(camera_id: str) -> bool:
+    """Claim a camera ID across workers; False if another worker already holds it"""
+    if not redis_client:
+        return True
+    return bool(await redis_client.set(CAMERA_KEY_PREFIX + camera_id, b"{}", nx=True))
+
+async def save_camera(camera_id: str):
+    """Persist a camera entry and broadcast it to the other workers"""
+    if not redis_client:
+        return
+    camera_data = cameras_store[camera_id]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(CAMERA_KEY_PREFIX + camera_id, orjson.dumps(camera_data))
+        pipe.sadd(CAMERA_INDEX_KEY, camera_id)
+        pipe.publish(CAMERA_EVENTS_CHANNEL, orjson.dumps(
+            {"op": "put", "camera_id": camera_id, "camera": camera_data}
+        ))
+        await pipe.execute()
+
+async def forget_camera(camera_id: str):
+    """Delete a camera entry and broadcast the removal to the other workers"""
+    if not redis_client:
+        return
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(CAMERA_KEY_PREFIX + camera_id)
+        pipe.srem(CAMERA_INDEX_KEY, camera_id)
+        pipe.publish(CAMERA_EVENTS_CHANNEL, orjson.dumps({"op": "del", "camera_id": camera_id}))
+        await pipe.execute()
+
+async def load_cameras():
+    """Fill the local store from Redis at startup"""
+    camera_ids = [camera_id.decode() for camera_id in await redis_client.smembers(CAMERA_INDEX_KEY)]
+    if not camera_ids:
+        return
+    values = await redis_client.mget([CAMERA_KEY_PREFIX + camera_id for camera_id in camera_ids])
+    for camera_id, value in zip(camera_ids, values):
+        if value:
+            cameras_store[camera_id] = orjson.loads(value)
+    logger.info(f"Loaded {len(cameras_store)} cameras from Redis")
+
+async def listen_for_camera_events():
+    """Apply camera changes made by other workers to the local store"""
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(CAMERA_EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = orjson.loads(message["data"])
+                    if event["op"] == "del":
+                        cameras_store.pop(event["camera_id"], None)
+                    else:
+                        cameras_store[event["camera_id"]] = event["camera"]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Camera event subscription failed, retrying: {e}")
+            await asyncio.sleep(5)
+
 @app.on_event("startup")
 async def startup_event():
+    global redis_client, camera_events_task
     logger.info("Starting Janus Gateway API for VAS")
     logger.info(f"Janus HTTP URL: {JANUS_HTTP_URL}")
     logger.info(f"Janus WebSocket URL: {JANUS_WS_URL}")
+    
+    if REDIS_URL:
+        redis_client = redis.from_url(REDIS_URL)
+        await load_cameras()
+        camera_events_task = asyncio.create_task(listen_for_camera_events())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if camera_events_task:
+        camera_events_task.cancel()
+        try:
+            await camera_events_task
+        except asyncio.CancelledError:
+            pass
+    if redis_client:
+        await redis_client.aclose()
     await janus_client.close()
     logger.info("Janus Gateway API shutdown complete")
 
@@ -177,7 +338,7 @@ async def health_check():
         session = await janus_client.get_session()
         payload = {
             "janus": "list_sessions",
-            "transaction": str(uuid.uuid4())
+            "transaction": janus_client.transaction_id()
         }
         
         async with session.post(JANUS_HTTP_URL, json=payload) as response:
@@ -203,13 +364,25 @@ async def add_camera(camera: CameraConfig):
     if camera.camera_id in cameras_store:
         raise HTTPException(status_code=409, detail="Camera already exists")
     
+    # Reserve the camera before the first await so concurrent adds in this
+    # worker cannot claim it, then claim it across workers
+    cameras_store[camera.camera_id] = {
+        "config": camera.dict(),
+        "stream_id": None,
+        "status": "creating"
+    }
+    try:
+        if not await reserve_camera(camera.camera_id):
+            raise HTTPException(status_code=409, detail="Camera already exists")
+    except Exception:
+        cameras_store.pop(camera.camera_id, None)
+        raise
+    
+    stream_id = None
     try:
-        # Create Janus session for this camera
-        session_id = await janus_client.create_session()
-        handle_id = await janus_client.attach_plugin(session_id, "janus.plugin.streaming")
-        
         # Generate unique stream ID
-        stream_id = len(cameras_store) + 1
+        stream_id = await allocate_stream_id()
+        cameras_store[camera.camera_id]["stream_id"] = stream_id
         
         # Create streaming mountpoint
         create_message = {
@@ -228,16 +401,15 @@ async def add_camera(camera: CameraConfig):
             "videocodec": "h264"
         }
         
-        response = await janus_client.send_message(session_id, handle_id, create_message)
+        response = await janus_client.send_management_message(create_message)
         
         # Store camera configuration
         cameras_store[camera.camera_id] = {
             "config": camera.dict(),
-            "session_id": session_id,
-            "handle_id": handle_id,
             "stream_id": stream_id,
             "status": "active"
         }
+        await save_camera(camera.camera_id)
         
         logger.info(f"Camera {camera.camera_id} added successfully with stream ID {stream_id}")
         
@@ -250,9 +422,36 @@ async def add_camera(camera: CameraConfig):
         )
         
     except Exception as e:
+        cameras_store.pop(camera.camera_id, None)
+        try:
+            if stream_id is not None:
+                await release_stream_id(stream_id)
+            await forget_camera(camera.camera_id)
+        except Exception as cleanup_error:
+            logger.warning(f"Failed to release camera {camera.camera_id}: {cleanup_error}")
         logger.error(f"Failed to add camera {camera.camera_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to add camera: {str(e)}")
 
+@app.post("/cameras/batch")
+async def add_cameras_batch(cameras: List[CameraConfig]):
+    """Add several cameras concurrently"""
+    results = await asyncio.gather(
+        *(add_camera(camera) for camera in cameras),
+        return_exceptions=True
+    )
+    
+    added = []
+    errors = []
+    for camera, result in zip(cameras, results):
+        if isinstance(result, HTTPException):
+            errors.append({"camera_id": camera.camera_id, "detail": result.detail})
+        elif isinstance(result, Exception):
+            errors.append({"camera_id": camera.camera_id, "detail": str(result)})
+        else:
+            added.append(result)
+    
+    return {"cameras": added, "errors": errors}
+
 @app.get("/cameras", response_model=List[CameraResponse])
 async def list_cameras():
     """Get list of all configured cameras"""
@@ -320,11 +519,7 @@ async def restart_camera(camera_id: str):
             "id": camera_data["stream_id"]
         }
         
-        await janus_client.send_message(
-            camera_data["session_id"], 
-            camera_data["handle_id"], 
-            destroy_message
-        )
+        await janus_client.send_management_message(destroy_message)
         
         # Recreate stream with same configuration
         config = camera_data["config"]
@@ -344,11 +539,7 @@ async def restart_camera(camera_id: str):
             "videocodec": "h264"
         }
         
-        await janus_client.send_message(
-            camera_data["session_id"], 
-            camera_data["handle_id"], 
-            create_message
-        )
+        await janus_client.send_management_message(create_message)
         
         logger.info(f"Camera {camera_id} restarted successfully")
         return {"message": f"Camera {camera_id} restarted successfully"}
@@ -372,17 +563,12 @@ async def remove_camera(camera_id: str):
             "id": camera_data["stream_id"]
         }
         
-        await janus_client.send_message(
-            camera_data["session_id"], 
-            camera_data["handle_id"], 
-            destroy_message
-        )
-        
-        # Destroy session
-        await janus_client.destroy_session(camera_data["session_id"])
+        await janus_client.send_management_message(destroy_message)
         
-        # Remove from store
+        # Remove from store and release the stream ID
         del cameras_store[camera_id]
+        await release_stream_id(camera_data["stream_id"])
+        await forget_camera(camera_id)
         
         logger.info(f"Camera {camera_id} removed successfully")
         return {"message": f"Camera {camera_id} removed successfully"}
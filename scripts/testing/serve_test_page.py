@@ -4,7 +4,6 @@ Simple HTTP server to serve the WebRTC API test page
 """
 
 import http.server
-import socketserver
 import webbrowser
 import os
 import sys
@@ -18,6 +17,10 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         super().end_headers()
+    
+    def copyfile(self, source, outputfile):
+        # Zero-copy transfer via sendfile(2); falls back to send() where unsupported
+        self.connection.sendfile(source)
 
 def main():
     # Change to the directory containing the test page
@@ -28,7 +31,8 @@ def main():
         print("❌ webrtc-api-test.html not found!")
         sys.exit(1)
     
-    with socketserver.TCPServer(("0.0.0.0", PORT), MyHTTPRequestHandler) as httpd:
+    # Threaded server so the page's assets are served concurrently
+    with http.server.ThreadingHTTPServer(("0.0.0.0", PORT), MyHTTPRequestHandler) as httpd:
         print(f"🌐 WebRTC API Test Server running at:")
         print(f"   http://localhost:{PORT}/webrtc-api-test.html")
         print(f"   http://127.0.0.1:{PORT}/webrtc-api-test.html")
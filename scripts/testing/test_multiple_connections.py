@@ -13,22 +13,28 @@ Usage:
 """
 
 import asyncio
+import contextlib
 import aiohttp
-import json
+import orjson
 import time
 import logging
-from typing import List, Dict, Any
+import statistics
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
-# Configure logging
+# Configure logging; epoch timestamps skip a strftime per record
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format='%(created).3f - %(levelname)s - %(message)s'
 )
+# None of these record attributes are in the format
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class ConnectionStats:
     stream_id: str
     start_time: float
@@ -44,136 +50,169 @@ class ConnectionStats:
         self.duration = self.end_time - self.start_time
 
 class WebRTCAPITester:
+    # Shared by every tester for the whole run so keep-alive connections stay warm
+    _session: Optional[aiohttp.ClientSession] = None
+    CONNECTOR_LIMIT = 256
+    CONNECTOR_LIMIT_PER_HOST = 64
+    
+    RETRY_ATTEMPTS = 3
+    RETRY_BACKOFF = 0.2  # seconds, doubled after each attempt
+    FAILURE_THRESHOLD = 3  # consecutive failed calls before a path is skipped
+    CIRCUIT_OPEN_SECONDS = 5.0
+    
     def __init__(self, base_url: str = "http://10.30.250.245:8000"):
         self.base_url = base_url
         self.auth_token = None
         self.session = None
         self.available_streams = []
         self.connection_stats = []
+        self._fail_streak: Dict[str, int] = {}
+        self._circuit_open_until: Dict[str, float] = {}
+        
+    @classmethod
+    def get_session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=cls.CONNECTOR_LIMIT,
+                    limit_per_host=cls.CONNECTOR_LIMIT_PER_HOST,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75
+                ),
+                timeout=aiohttp.ClientTimeout(total=30, connect=5)
+            )
+        return cls._session
+    
+    @classmethod
+    async def close_session(cls):
+        if cls._session:
+            await cls._session.close()
+            cls._session = None
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = self.get_session()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session is closed once, at the end of main()
+        self.session = None
+    
+    async def _request_json(self, method: str, path: str, description: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a request and return the parsed JSON body, or None on failure
+        
+        Server and network errors are retried with exponential backoff. After
+        FAILURE_THRESHOLD failed calls in a row, the path is skipped for
+        CIRCUIT_OPEN_SECONDS instead of hammering an endpoint that is down.
+        """
+        if time.monotonic() < self._circuit_open_until.get(path, 0.0):
+            return None
+        
+        error = None
+        for attempt in range(self.RETRY_ATTEMPTS):
+            try:
+                async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                    response.raise_for_status()
+                    body = await response.read()
+                self._fail_streak.pop(path, None)
+                return orjson.loads(body)
+            except aiohttp.ClientResponseError as e:
+                error = f"HTTP {e.status}"
+                if e.status < 500:
+                    break  # Client errors will not succeed on retry
+            except Exception as e:
+                error = str(e)
+            if attempt < self.RETRY_ATTEMPTS - 1:
+                await asyncio.sleep(self.RETRY_BACKOFF * 2 ** attempt)
+        
+        logger.error(f"❌ {description}: {error}")
+        streak = self._fail_streak.get(path, 0) + 1
+        if streak >= self.FAILURE_THRESHOLD:
+            self._circuit_open_until[path] = time.monotonic() + self.CIRCUIT_OPEN_SECONDS
+            streak = 0
+        self._fail_streak[path] = streak
+        return None
+    
+    async def _get_json(self, path: str, description: str) -> Optional[Dict[str, Any]]:
+        return await self._request_json("GET", path, description)
     
     async def authenticate(self, username: str = "admin", password: str = "admin123") -> bool:
         """Authenticate with the API and get access token"""
-        try:
-            logger.info(f"Authenticating with {self.base_url}")
-            
-            async with self.session.post(
-                f"{self.base_url}/api/auth/login-json",
-                json={"username": username, "password": password}
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.auth_token = data["access_token"]
-                    logger.info("✅ Authentication successful")
-                    return True
-                else:
-                    logger.error(f"❌ Authentication failed: HTTP {response.status}")
-                    return False
-                    
-        except Exception as e:
-            logger.error(f"❌ Authentication error: {e}")
+        logger.info(f"Authenticating with {self.base_url}")
+        
+        data = await self._request_json(
+            "POST", "/api/auth/login-json", "Authentication failed",
+            data=orjson.dumps({"username": username, "password": password}),
+            headers={"Content-Type": "application/json"}
+        )
+        if not data:
             return False
+        
+        self.auth_token = data["access_token"]
+        # Every later request on the session carries the token
+        self.session.headers["Authorization"] = f"Bearer {self.auth_token}"
+        logger.info("✅ Authentication successful")
+        return True
     
     async def discover_streams(self) -> List[Dict[str, Any]]:
         """Discover available WebRTC streams"""
-        try:
-            logger.info("Discovering available streams...")
-            
-            async with self.session.get(
-                f"{self.base_url}/api/streams/webrtc/streams",
-                headers={"Authorization": f"Bearer {self.auth_token}"}
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.available_streams = data["streams"]
-                    logger.info(f"✅ Found {len(self.available_streams)} streams")
-                    
-                    for stream in self.available_streams:
-                        logger.info(f"  - Stream {stream['stream_id']}: {stream['name']} ({stream['status']})")
-                    
-                    return self.available_streams
-                else:
-                    logger.error(f"❌ Stream discovery failed: HTTP {response.status}")
-                    return []
-                    
-        except Exception as e:
-            logger.error(f"❌ Stream discovery error: {e}")
+        logger.info("Discovering available streams...")
+        
+        data = await self._get_json("/api/streams/webrtc/streams", "Stream discovery failed")
+        if not data:
             return []
+        
+        self.available_streams = data["streams"]
+        logger.info(f"✅ Found {len(self.available_streams)} streams")
+        
+        for stream in self.available_streams:
+            logger.info(f"  - Stream {stream['stream_id']}: {stream['name']} ({stream['status']})")
+        
+        return self.available_streams
     
     async def get_stream_config(self, stream_id: str) -> Dict[str, Any]:
         """Get WebRTC configuration for a specific stream"""
-        try:
-            async with self.session.get(
-                f"{self.base_url}/api/streams/webrtc/streams/{stream_id}/config",
-                headers={"Authorization": f"Bearer {self.auth_token}"}
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"❌ Failed to get config for stream {stream_id}: HTTP {response.status}")
-                    return {}
-                    
-        except Exception as e:
-            logger.error(f"❌ Error getting config for stream {stream_id}: {e}")
-            return {}
+        return await self._get_json(
+            f"/api/streams/webrtc/streams/{stream_id}/config",
+            f"Failed to get config for stream {stream_id}"
+        ) or {}
     
     async def check_stream_status(self, stream_id: str) -> Dict[str, Any]:
         """Check status of a specific stream"""
-        try:
-            async with self.session.get(
-                f"{self.base_url}/api/streams/webrtc/streams/{stream_id}/status",
-                headers={"Authorization": f"Bearer {self.auth_token}"}
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"❌ Failed to get status for stream {stream_id}: HTTP {response.status}")
-                    return {}
-                    
-        except Exception as e:
-            logger.error(f"❌ Error getting status for stream {stream_id}: {e}")
-            return {}
+        return await self._get_json(
+            f"/api/streams/webrtc/streams/{stream_id}/status",
+            f"Failed to get status for stream {stream_id}"
+        ) or {}
     
     async def check_system_status(self) -> Dict[str, Any]:
         """Check overall system status"""
-        try:
-            async with self.session.get(
-                f"{self.base_url}/api/streams/webrtc/system/status",
-                headers={"Authorization": f"Bearer {self.auth_token}"}
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"❌ Failed to get system status: HTTP {response.status}")
-                    return {}
-                    
-        except Exception as e:
-            logger.error(f"❌ Error getting system status: {e}")
-            return {}
+        return await self._get_json(
+            "/api/streams/webrtc/system/status", "Failed to get system status"
+        ) or {}
     
-    async def simulate_connection(self, stream_id: str, duration: float = 10.0) -> ConnectionStats:
-        """Simulate a WebRTC connection to a stream"""
+    async def simulate_connection(self, stream_id: str, duration: float = 10.0,
+                                  request_slots: Optional[asyncio.Semaphore] = None) -> ConnectionStats:
+        """Simulate a WebRTC connection to a stream
+        
+        request_slots bounds how many simulations talk to the API at once; it is
+        only held for the HTTP calls, not for the simulated connection time.
+        """
         stats = ConnectionStats(stream_id=stream_id, start_time=time.time())
         self.connection_stats.append(stats)
         
         try:
             logger.info(f"🔗 Simulating connection to stream {stream_id}")
             
-            # Get stream configuration
-            config = await self.get_stream_config(stream_id)
+            async with request_slots or contextlib.nullcontext():
+                # Fetch configuration and status concurrently
+                config, status = await asyncio.gather(
+                    self.get_stream_config(stream_id),
+                    self.check_stream_status(stream_id)
+                )
+            
             if not config:
                 stats.finish("failed", "No configuration available")
                 return stats
             
-            # Get stream status
-            status = await self.check_stream_status(stream_id)
             if not status or status.get("status") != "active":
                 stats.finish("failed", "Stream not active")
                 return stats
@@ -213,15 +252,18 @@ class WebRTCAPITester:
         
         logger.info(f"📡 Testing streams: {test_streams}")
         
-        # Start all connections concurrently
+        # Start all connections concurrently, with API calls bounded by what
+        # the connector can actually serve so requests don't time out queued
+        request_slots = asyncio.Semaphore(min(num_connections, self.CONNECTOR_LIMIT_PER_HOST))
         start_time = time.time()
-        tasks = [
-            self.simulate_connection(stream_id, duration)
-            for stream_id in test_streams
-        ]
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(self.simulate_connection(stream_id, duration, request_slots))
+                for stream_id in test_streams
+            ]
         
-        # Wait for all connections to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # The TaskGroup has waited for all connections to complete
+        results = [task.result() for task in tasks]
         end_time = time.time()
         
         # Analyze results
@@ -255,9 +297,12 @@ class WebRTCAPITester:
         logger.info(f"  Success Rate: {(successful/len(results)*100):.1f}%")
         logger.info(f"  Total Test Time: {total_time:.2f}s")
         
-        if successful > 0:
-            avg_duration = sum(r.duration for r in self.connection_stats if r.duration) / successful
-            logger.info(f"  Average Connection Duration: {avg_duration:.2f}s")
+        durations = [r.duration for r in self.connection_stats if r.status == "completed"]
+        if durations:
+            logger.info(f"  Average Connection Duration: {statistics.fmean(durations):.2f}s")
+        if len(durations) > 1:
+            cuts = statistics.quantiles(durations, n=100, method="inclusive")
+            logger.info(f"  Duration p50/p95/p99: {cuts[49]:.2f}s / {cuts[94]:.2f}s / {cuts[98]:.2f}s")
     
     async def run_comprehensive_test(self):
         """Run a comprehensive test of the WebRTC API Gateway"""
@@ -286,11 +331,13 @@ class WebRTCAPITester:
         
         # Step 4: Test individual stream configurations
         logger.info("\n🔧 Testing individual stream configurations...")
-        for stream in streams[:3]:  # Test first 3 streams
+        sample_streams = streams[:3]  # Test first 3 streams
+        configs, statuses = await asyncio.gather(
+            asyncio.gather(*[self.get_stream_config(s["stream_id"]) for s in sample_streams]),
+            asyncio.gather(*[self.check_stream_status(s["stream_id"]) for s in sample_streams])
+        )
+        for stream, config, status in zip(sample_streams, configs, statuses):
             stream_id = stream["stream_id"]
-            config = await self.get_stream_config(stream_id)
-            status = await self.check_stream_status(stream_id)
-            
             logger.info(f"  Stream {stream_id} ({stream['name']}):")
             logger.info(f"    Config Available: {'✅' if config else '❌'}")
             logger.info(f"    Status: {status.get('status', 'unknown')}")
@@ -304,8 +351,11 @@ class WebRTCAPITester:
 
 async def main():
     """Main function to run the test"""
-    async with WebRTCAPITester() as tester:
-        await tester.run_comprehensive_test()
+    try:
+        async with WebRTCAPITester() as tester:
+            await tester.run_comprehensive_test()
+    finally:
+        await WebRTCAPITester.close_session()
 
 if __name__ == "__main__":
     try:
@@ -7,8 +7,8 @@ Tests the snapshot functionality without affecting existing system
 import asyncio
 import sys
 import os
-import requests
-import json
+import httpx
+import orjson
 from datetime import datetime
 
 # Add the backend directory to Python path
@@ -18,69 +18,73 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'vas', 'backend'))
 BASE_URL = "http://localhost:8000"
 API_BASE = f"{BASE_URL}/api"
 
-def test_api_health():
+def create_client():
+    """One pooled client for the whole run; every call reuses its connections"""
+    return httpx.Client(
+        base_url=API_BASE,
+        headers={"Content-Type": "application/json"},
+        timeout=10,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    )
+
+def test_api_health(client):
     """Test if the API is running"""
     try:
-        response = requests.get(f"{API_BASE}/health", timeout=5)
+        response = client.get("/health", timeout=5)
         if response.status_code == 200:
             print("✅ API is running")
             return True
         else:
             print(f"❌ API health check failed: {response.status_code}")
             return False
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Cannot connect to API: {e}")
         return False
 
-def authenticate():
-    """Authenticate and get token"""
+def authenticate(client):
+    """Authenticate and get token; later calls on the client send it automatically"""
     try:
-        response = requests.post(
-            f"{API_BASE}/auth/login-json",
-            json={"username": "admin", "password": "admin123"},
-            headers={"Content-Type": "application/json"}
+        response = client.post(
+            "/auth/login-json",
+            content=orjson.dumps({"username": "admin", "password": "admin123"})
         )
         
         if response.status_code == 200:
-            token = response.json()["access_token"]
+            token = orjson.loads(response.content)["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
             print("✅ Authentication successful")
             return token
         else:
             print(f"❌ Authentication failed: {response.status_code}")
             return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Authentication error: {e}")
         return None
 
-def get_devices(token):
+def get_devices(client):
     """Get list of devices"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_BASE}/devices/", headers=headers)
+        response = client.get("/devices/")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             devices = data.get("devices", [])
             print(f"✅ Found {len(devices)} devices")
             return devices
         else:
             print(f"❌ Failed to get devices: {response.status_code}")
             return []
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error getting devices: {e}")
         return []
 
-def test_snapshot_capture(token, device_id):
+def test_snapshot_capture(client, device_id):
     """Test snapshot capture for a device"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.post(
-            f"{API_BASE}/snapshots/capture/{device_id}",
-            headers=headers
-        )
+        response = client.post(f"/snapshots/capture/{device_id}")
         
         if response.status_code == 200:
-            snapshot = response.json()
+            snapshot = orjson.loads(response.content)
             print(f"✅ Snapshot captured successfully: {snapshot['id']}")
             print(f"   - Format: {snapshot['image_format']}")
             print(f"   - Size: {snapshot['file_size']} bytes")
@@ -91,44 +95,36 @@ def test_snapshot_capture(token, device_id):
             print(f"❌ Snapshot capture failed: {response.status_code}")
             print(f"   Response: {response.text}")
             return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error capturing snapshot: {e}")
         return None
 
-def test_snapshot_retrieval(token, snapshot_id):
+def test_snapshot_retrieval(client, snapshot_id):
     """Test snapshot image retrieval"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(
-            f"{API_BASE}/snapshots/{snapshot_id}/image",
-            headers=headers
-        )
+        # Raw bytes: no base64 inflation on the wire and nothing to decode
+        response = client.get(f"/snapshots/{snapshot_id}/binary")
         
         if response.status_code == 200:
-            snapshot_data = response.json()
-            image_data = snapshot_data["image_data"]
+            image_bytes = response.content
             print(f"✅ Snapshot image retrieved successfully")
-            print(f"   - Image data length: {len(image_data)} characters (base64)")
-            print(f"   - Format: {snapshot_data['image_format']}")
-            return snapshot_data
+            print(f"   - Image size: {len(image_bytes)} bytes")
+            print(f"   - Format: {response.headers.get('content-type')}")
+            return image_bytes
         else:
             print(f"❌ Snapshot retrieval failed: {response.status_code}")
             return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error retrieving snapshot: {e}")
         return None
 
-def test_device_snapshots(token, device_id):
+def test_device_snapshots(client, device_id):
     """Test getting all snapshots for a device"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(
-            f"{API_BASE}/snapshots/device/{device_id}",
-            headers=headers
-        )
+        response = client.get(f"/snapshots/device/{device_id}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             snapshots = data["snapshots"]
             print(f"✅ Found {len(snapshots)} snapshots for device")
             print(f"   - Total: {data['total']}")
@@ -138,43 +134,53 @@ def test_device_snapshots(token, device_id):
         else:
             print(f"❌ Failed to get device snapshots: {response.status_code}")
             return []
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error getting device snapshots: {e}")
         return []
 
 def main():
     """Main test function"""
+    client = create_client()
+    try:
+        return run_tests(client)
+    finally:
+        client.close()
+
+def run_tests(client):
+    """Run the snapshot checks in order over one client"""
     print("🧪 Snapshot Feature Test")
     print("=" * 50)
     
     # Test 1: API Health
     print("\n1. Testing API Health...")
-    if not test_api_health():
+    if not test_api_health(client):
         print("❌ Cannot proceed - API is not running")
         return False
     
     # Test 2: Authentication
     print("\n2. Testing Authentication...")
-    token = authenticate()
+    token = authenticate(client)
     if not token:
         print("❌ Cannot proceed - Authentication failed")
         return False
     
     # Test 3: Get Devices
     print("\n3. Getting Devices...")
-    devices = get_devices(token)
+    devices = get_devices(client)
     if not devices:
         print("❌ Cannot proceed - No devices found")
         return False
     
     # Find a live camera device
-    live_device = None
-    for device in devices:
-        if device.get("status") == "ONLINE" and device.get("rtsp_url"):
-            # Update RTSP URL with proper credentials for testing
-            device["rtsp_url"] = device["rtsp_url"].replace("rtsp://", "rtsp://root:G3M13m0b@")
-            live_device = device
-            break
+    live_device = next(
+        (d for d in devices if d.get("status") == "ONLINE" and d.get("rtsp_url")), None
+    )
+    if live_device:
+        # Use a copy with test credentials rather than editing the listed device
+        live_device = {
+            **live_device,
+            "rtsp_url": live_device["rtsp_url"].replace("rtsp://", "rtsp://root:G3M13m0b@", 1)
+        }
     
     if not live_device:
         print("❌ No online devices with RTSP URLs found")
@@ -187,21 +193,21 @@ def main():
     
     # Test 4: Capture Snapshot
     print(f"\n4. Testing Snapshot Capture for {live_device['name']}...")
-    snapshot = test_snapshot_capture(token, live_device["id"])
+    snapshot = test_snapshot_capture(client, live_device["id"])
     if not snapshot:
         print("❌ Snapshot capture failed")
         return False
     
     # Test 5: Retrieve Snapshot Image
     print(f"\n5. Testing Snapshot Image Retrieval...")
-    snapshot_data = test_snapshot_retrieval(token, snapshot["id"])
+    snapshot_data = test_snapshot_retrieval(client, snapshot["id"])
     if not snapshot_data:
         print("❌ Snapshot image retrieval failed")
         return False
     
     # Test 6: Get Device Snapshots
     print(f"\n6. Testing Device Snapshots List...")
-    device_snapshots = test_device_snapshots(token, live_device["id"])
+    device_snapshots = test_device_snapshots(client, live_device["id"])
     if device_snapshots is None:
         print("❌ Device snapshots retrieval failed")
         return False
@@ -209,18 +215,14 @@ def main():
     # Test 7: Test Latest Snapshot
     print(f"\n7. Testing Latest Snapshot...")
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(
-            f"{API_BASE}/snapshots/device/{live_device['id']}/latest",
-            headers=headers
-        )
+        response = client.get(f"/snapshots/device/{live_device['id']}/latest")
         
         if response.status_code == 200:
-            latest = response.json()
+            latest = orjson.loads(response.content)
             print(f"✅ Latest snapshot retrieved: {latest['id']}")
         else:
             print(f"❌ Latest snapshot retrieval failed: {response.status_code}")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error getting latest snapshot: {e}")
     
     print("\n" + "=" * 50)
@@ -228,7 +230,7 @@ def main():
     print("\nAPI Endpoints tested:")
     print("✅ POST /api/snapshots/capture/{device_id}")
     print("✅ GET  /api/snapshots/{snapshot_id}")
-    print("✅ GET  /api/snapshots/{snapshot_id}/image")
+    print("✅ GET  /api/snapshots/{snapshot_id}/binary")
     print("✅ GET  /api/snapshots/device/{device_id}")
     print("✅ GET  /api/snapshots/device/{device_id}/latest")
     